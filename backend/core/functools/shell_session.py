@@ -0,0 +1,178 @@
+# core/functools/shell_session.py
+# [新增文件] 常驻 PowerShell 会话：复用同一个进程执行命令，省去每次启动 PowerShell 的数百毫秒开销
+import os
+import uuid
+import signal
+import queue
+import base64
+import time
+import threading
+import subprocess
+from collections import deque
+
+# 中断哨兵：stop_event 触发时由监听线程放入输出队列，读取端无需轮询
+_INTERRUPT = object()
+
+# [新增] 启动 PowerShell 时使用的创建标志：不弹窗 + 独立进程组 (非 Windows 平台上均为 0)
+PROCESS_CREATION_FLAGS = getattr(subprocess, 'CREATE_NO_WINDOW', 0) | getattr(subprocess, 'CREATE_NEW_PROCESS_GROUP', 0)
+
+
+def kill_process_tree(process):
+    """
+    [新增] 结束进程及其派生的全部子进程。
+    Windows 上 Popen.kill() 只结束 PowerShell 本身，它启动的 python/npm 等子进程会继续占用 CPU，
+    因此用 taskkill /T 递归结束整棵进程树；其他平台向独立会话 (start_new_session) 的进程组发送 SIGKILL。
+    """
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == 'nt':
+            subprocess.run(
+                ['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0),
+                timeout=10
+            )
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        pass
+    # 兜底：taskkill 不可用或进程组已不存在时，至少结束主进程
+    if process.poll() is None:
+        try:
+            process.kill()
+        except OSError:
+            pass
+
+
+class PersistentShell:
+    """
+    通过 stdin 向常驻的 `powershell -Command -` 进程逐条发送命令，读取 stdout 直到出现结束标记。
+    - 命令以 Base64 编码后 Invoke-Expression 执行，多行脚本也只占一行 stdin
+    - stderr 通过 2>&1 合并进 stdout
+    - 超时或被中断时直接结束进程，下一次调用自动重启
+    - 同一时刻只执行一条命令；会话忙时 run() 返回 None，调用方应回退到一次性进程
+    """
+
+    def __init__(self, decode, max_bytes):
+        self._decode = decode
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._process = None
+        self._lines = None
+
+    def _spawn(self):
+        env = os.environ.copy()
+        env["PYTHONIOENCODING"] = "utf-8"
+        env["LANG"] = "C.UTF-8"
+        self._process = subprocess.Popen(
+            ["powershell", "-NoLogo", "-NoProfile", "-NonInteractive", "-Command", "-"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            creationflags=PROCESS_CREATION_FLAGS,
+            start_new_session=True,
+            env=env
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._pump, args=(self._process.stdout, self._lines), daemon=True).start()
+        self._send("[Console]::OutputEncoding = [System.Text.Encoding]::UTF8")
+
+    @staticmethod
+    def _pump(pipe, lines):
+        """后台线程：把 stdout 逐行搬运到队列，EOF 时放入 None"""
+        try:
+            for line in iter(pipe.readline, b''):
+                lines.put(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            lines.put(None)
+
+    def _send(self, line):
+        self._process.stdin.write((line + "\n").encode('utf-8'))
+        self._process.stdin.flush()
+
+    def _alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def close(self):
+        """结束常驻进程 (连同正在运行的命令派生的子进程)"""
+        if self._process is not None:
+            kill_process_tree(self._process)
+            self._process = None
+
+    def run(self, command, cwd=None, timeout=120, stop_event=None):
+        """
+        执行一条命令，返回 (状态, 输出文本, 是否截断)，状态为 "ok" / "timeout" / "interrupted"。
+        会话正被其他线程占用时返回 None。
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            if not self._alive():
+                self._spawn()
+
+            marker = f"__RESONANCE_END_{uuid.uuid4().hex}__"
+            location = (cwd or os.getcwd()).replace("'", "''")
+            script = f"Set-Location -LiteralPath '{location}'\n{command}"
+            encoded = base64.b64encode(script.encode('utf-8')).decode('ascii')
+            self._send(
+                "try { Invoke-Expression ([System.Text.Encoding]::UTF8.GetString("
+                f"[System.Convert]::FromBase64String('{encoded}'))) 2>&1 | Out-String -Stream }} "
+                f"catch {{ $_ | Out-String -Stream }}; Write-Output '{marker}'"
+            )
+
+            # [修改点] 读取端直接阻塞在队列上 (超时 = 剩余时间)，中断由监听线程向队列投递哨兵唤醒，
+            # 取代固定间隔轮询 stop_event
+            done = threading.Event()
+            lines = self._lines
+            if stop_event:
+                def _watch_interrupt():
+                    while not done.is_set():
+                        if stop_event.wait(0.5):
+                            lines.put(_INTERRUPT)
+                            return
+
+                threading.Thread(target=_watch_interrupt, daemon=True).start()
+
+            out = deque()
+            size = 0
+            truncated = False
+            deadline = time.monotonic() + timeout
+            marker_bytes = marker.encode('ascii')
+            while True:
+                try:
+                    line = lines.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    done.set()
+                    self.close()
+                    return "timeout", "", False
+                if line is _INTERRUPT:
+                    # 上一条命令遗留的哨兵 (本次未被中断) 直接丢弃
+                    if not (stop_event and stop_event.is_set()):
+                        continue
+                    done.set()
+                    self.close()
+                    return "interrupted", "", False
+                if line is None:
+                    # 进程意外退出
+                    done.set()
+                    self.close()
+                    break
+                if line.strip() == marker_bytes:
+                    done.set()
+                    break
+                out.append(line)
+                size += len(line)
+                while size > self._max_bytes and len(out) > 1:
+                    size -= len(out.popleft())
+                    truncated = True
+
+            return "ok", self._decode(b''.join(out)), truncated
+        except OSError:
+            self.close()
+            return None
+        finally:
+            self._lock.release()
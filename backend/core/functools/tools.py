@@ -1,12 +1,449 @@
 # core/functools/tools.py
 # [修改说明] 新增主动记忆管理工具
 import os
+import re
 import sys
 import subprocess
 import time
 import json
+import mmap
+import codecs
+import functools
+import shutil
+import stat
+import sqlite3
 import threading
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from core.functools.web_engine import WebEngine
+from core.functools.trigram_index import TrigramIndex, index_path_for
+from core.functools.shell_session import PersistentShell, PROCESS_CREATION_FLAGS, kill_process_tree
+
+# [新增] execute_shell 每个输出流最多保留的字节数 (超出后丢弃最早的行，只保留末尾)
+SHELL_OUTPUT_MAX_BYTES = 256 * 1024
+# 单次 readline 的上限，防止无换行的超长输出一次性读入内存
+SHELL_READ_CHUNK = 64 * 1024
+
+# [新增] 关键词搜索的忽略目录与文本扩展名 (ripgrep 与 Python 回退实现共用)
+SEARCH_IGNORE_DIRS = frozenset({'.git', '.obsidian', 'node_modules', '__pycache__'})
+SEARCH_TEXT_EXTS = frozenset({'.md', '.txt', '.py', '.json', '.yaml', '.csv', '.log', '.xml', '.html', '.css', '.js'})
+# [新增] list_directory_files 最多列出的文件数 (适当放宽，防止遗漏关键结构)，及输出字符预算 (约 4K tokens)
+LIST_MAX_FILES = 150
+LIST_MAX_CHARS = 16 * 1024
+# [新增] 目录树结果缓存的条目数 (以所读目录的 mtime 校验新鲜度)
+LIST_CACHE_SIZE = 32
+# [新增] list_directory_files 的忽略列表，及 read_file_content 按扩展名直接跳过的二进制类型
+LIST_IGNORE_DIRS = frozenset({'.git', '.idea', '.vscode', '__pycache__', 'node_modules', 'venv', '.obsidian'})
+LIST_IGNORE_EXTS = frozenset({'.exe', '.dll', '.so', '.dylib', '.class', '.pyc', '.png', '.jpg', '.jpeg', '.zip', '.tar', '.gz'})
+READ_BINARY_EXTS = frozenset({'.exe', '.dll', '.png', '.jpg', '.zip', '.pdf', '.docx'})
+# ripgrep 搜索的超时 (秒) 与最多返回的文件数
+RG_TIMEOUT = 30
+RG_MAX_RESULTS = 200
+# [新增] ripgrep 的固定参数与过滤 glob (由上面两个集合派生，模块加载时构建一次)
+_RG_BASE_ARGS = (
+    '--files-with-matches', '--fixed-strings', '--ignore-case', '--no-messages',
+    *(arg for d in sorted(SEARCH_IGNORE_DIRS) for arg in ('-g', f'!{d}')),
+    *(arg for ext in sorted(SEARCH_TEXT_EXTS) for arg in ('-g', f'*{ext}')),
+)
+# [新增] Python 回退搜索：最多扫描的文件数与并发读取线程数 (文件读取是 I/O 密集，线程可绕开 GIL 等待)
+SEARCH_MAX_SCAN = 500
+SEARCH_WORKERS = 8
+# [修改点] 小于该大小的文件直接整体读入匹配，更大的文件改用 mmap 映射后搜索 (不再分块复制)
+SEARCH_MMAP_MIN = 4 * 1024
+# [新增] scan_and_remember 识别项目/笔记库的标记文件，及并发列目录的线程数
+PROJECT_MARKERS = frozenset({'.git', 'package.json', 'requirements.txt', 'pom.xml', '.obsidian'})
+SCAN_WORKERS = 16
+
+# [新增] 用户画像写入的合并窗口 (秒)：窗口内多次记录事实只落盘一次
+PROFILE_FLUSH_DELAY = 0.5
+
+# [新增] trigram 索引缓存目录 (位于 log_dir/workspace 下)
+TRIGRAM_CACHE_DIRNAME = ".trigram_cache"
+
+# [新增] read_file_content 单次读取上限 (字符数)，及按 (path, mtime, size) 缓存的文件数 (内存上界约 64 * 50K 字符)
+READ_MAX_SIZE = 50 * 1024
+# 以二进制读取的字节上限：单个字符最多 4 字节 (UTF-8 / UTF-32)，保证能解码出 READ_MAX_SIZE 个字符
+READ_MAX_BYTES = READ_MAX_SIZE * 4
+READ_CACHE_SIZE = 64
+
+
+def _walk_scandir(path, ignore_dirs):
+    """
+    [新增] 基于 os.scandir 的递归遍历，逐个产出文件路径。
+    DirEntry.is_dir() 复用读目录时拿到的类型信息，忽略目录在条目层面直接跳过，不再 stat 也不再进入。
+    """
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return
+    subdirs = []
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in ignore_dirs:
+                    subdirs.append(entry.path)
+            else:
+                yield entry.path
+        except OSError:
+            continue
+    for sub in subdirs:
+        yield from _walk_scandir(sub, ignore_dirs)
+
+
+# [新增] 字节序标记 (BOM) -> 编码；带 BOM 的数据直接按对应编码一次解码 (UTF-32 需排在 UTF-16 之前匹配)
+_BOM_ENCODINGS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def _bom_encoding(data):
+    """[新增] 根据开头的 BOM 返回编码名，没有 BOM 时返回 None"""
+    for bom, encoding in _BOM_ENCODINGS:
+        if data.startswith(bom):
+            return encoding
+    return None
+
+
+# [新增] 二进制嗅探：检查文件头部的字节数，以及控制字符占比阈值
+SNIFF_BYTES = 512
+SNIFF_CONTROL_RATIO = 0.3
+_TEXT_CONTROL_BYTES = frozenset(b'\t\n\r\f\b\x1b')
+
+
+def _looks_binary(head):
+    """[新增] 头部含 NUL 字节，或非文本控制字符占比过高时视为二进制"""
+    if not head:
+        return False
+    if b'\x00' in head:
+        return True
+    control = sum(1 for b in head if b < 32 and b not in _TEXT_CONTROL_BYTES)
+    return control / len(head) > SNIFF_CONTROL_RATIO
+
+
+@functools.lru_cache(maxsize=READ_CACHE_SIZE)
+def _read_text_cached(file_path, mtime_ns, file_size):
+    """
+    [新增] 读取并解码文件 (UTF-8 失败回退 GBK)。mtime_ns / file_size 仅作为缓存键，
+    文件被修改后键随之变化，旧条目自然失效。读取异常不会被缓存。
+    [修改点] 只打开一次、以二进制读取至多 READ_MAX_BYTES 字节：先嗅探头部判断二进制，再在内存中解码，
+    解码后截取前 READ_MAX_SIZE 个字符 (与文本模式 f.read(READ_MAX_SIZE) 的字符上限一致，中文文件不会读得更少)
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read(READ_MAX_BYTES)
+
+    # 文件没有被完整读入时，末尾可能切断多字节字符
+    cut_off = file_size > len(data)
+    # [新增] 带 BOM 的文本 (如 PowerShell 导出的 UTF-16) 直接按 BOM 解码，不参与二进制嗅探
+    bom_encoding = _bom_encoding(data)
+    if bom_encoding:
+        content = data.decode(bom_encoding, errors='replace')
+        return _truncate_text(content, cut_off, file_size)
+
+    if _looks_binary(data[:SNIFF_BYTES]):
+        return f"[System Warning]: File '{os.path.basename(file_path)}' appears to be binary (detected from content). Reading raw text is skipped."
+
+    # [修改点] 纯 ASCII 内容 (多数源码/配置文件) 整块扫描后直接按 ASCII 解码，跳过 UTF-8 校验与截断回退
+    # 其余尝试 UTF-8；截断读取时末尾可能切断多字节字符，最多回退 3 个字节重试
+    content = data.decode('ascii') if data.isascii() else None
+    for cut in range(0 if content is not None else (4 if cut_off else 1)):
+        try:
+            content = (data[:-cut] if cut else data).decode('utf-8')
+            break
+        except UnicodeDecodeError:
+            continue
+
+    if content is not None:
+        return _truncate_text(content, cut_off, file_size)
+    # 失败则尝试 GBK
+    content = data.decode('gbk', errors='replace')
+    if cut_off or len(content) > READ_MAX_SIZE:
+        return content[:READ_MAX_SIZE] + "\n\n[System Warning]: File content truncated. (Read with GBK fallback)"
+    return content
+
+
+def _truncate_text(content, cut_off, file_size):
+    """[新增] 截取前 READ_MAX_SIZE 个字符；有内容未返回时追加截断提示"""
+    if cut_off or len(content) > READ_MAX_SIZE:
+        return content[:READ_MAX_SIZE] + f"\n\n[System Warning]: File content truncated (Size: {file_size} bytes). Read first {READ_MAX_SIZE} characters."
+    return content
+
+
+# [新增] 静态内置工具定义提升为模块级常量 (仅 invoke_legacy_script 依赖配置，按需动态追加)
+_NATIVE_TOOL_SCHEMA = (
+    # --- Active Memory Tools (New) ---
+    {
+        "type": "function",
+        "function": {
+            "name": "search_long_term_memory",
+            "description": "Actively search the long-term vector database. Use this when you need to recall past projects, user preferences, or facts that are not in the current context.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "The search query string."}
+                },
+                "required": ["query"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "add_long_term_memory",
+            "description": "Explicitly save a new fact to long-term memory. Use this for important user instructions, project details, or learned solutions.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "text": {"type": "string", "description": "The content to remember."},
+                    "tag": {"type": "string", "description": "A short tag for categorization, e.g., 'project_info', 'user_preference', 'coding_rule'. Default: 'ai_note'."}
+                },
+                "required": ["text"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "delete_long_term_memory",
+            "description": "Delete a specific memory entry by ID. Use 'search_long_term_memory' first to find the ID if needed.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "memory_id": {"type": "string", "description": "The UUID of the memory to delete."}
+                },
+                "required": ["memory_id"]
+            }
+        }
+    },
+
+    # --- 技能管理 ---
+    {
+        "type": "function",
+        "function": {
+            "name": "manage_skills",
+            "description": "Manage AI Skills. Use 'list_available' to see the index of skills. Use 'activate' to load a specific skill's SOP and tools.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "action": {"type": "string", "enum": ["list_available", "activate", "deactivate_all"]},
+                    "skill_name": {"type": "string", "description": "Required if action is 'activate'."}
+                },
+                "required": ["action"]
+            }
+        }
+    },
+    # --- 核心能力 ---
+    {
+        "type": "function",
+        "function": {
+            "name": "browse_url",
+            "description": "Visit a specific URL and extract its text content. Use this with URLs.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "url": {
+                        "type": "string",
+                        "description": "The URL to visit (must start with http/https)."
+                    }
+                },
+                "required": ["url"]
+            }
+        }
+    },
+    # [新增] 一次并发访问多个网页
+    {
+        "type": "function",
+        "function": {
+            "name": "browse_urls",
+            "description": "Visit several URLs in parallel and extract their text content. Prefer this over repeated browse_url calls when reading multiple pages (e.g. several search results).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "urls": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "The URLs to visit (each must start with http/https)."
+                    }
+                },
+                "required": ["urls"]
+            }
+        }
+    },
+            
+    # --- [新增] 技能学习能力 ---
+    {
+        "type": "function",
+        "function": {
+            "name": "learn_new_skill",
+            "description": "Dynamically learn a new skill from a GitHub URL or local path. Use this when the user asks you to 'learn' something or provides a link to an MCP tool/python script.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "url_or_path": {
+                        "type": "string",
+                        "description": "The GitHub URL (starts with http) or absolute local file path to the skill folder."
+                    }
+                },
+                "required": ["url_or_path"]
+            }
+        }
+    },
+
+    # --- 文件系统能力 ---
+    {
+        "type": "function",
+        "function": {
+            "name": "list_directory_files",
+            "description": "List files in a directory recursively. Use this to understand project structure or find specific files.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "directory_path": {"type": "string", "description": "The absolute path."},
+                    "recursive": {"type": "boolean", "description": "Default True."},
+                    "depth": {"type": "integer", "description": "Max depth (default 2)."}
+                },
+                "required": ["directory_path"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_files_by_keyword",
+            "description": "Grep search inside files.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "directory_path": {"type": "string"},
+                    "keyword": {"type": "string"}
+                },
+                "required": ["directory_path", "keyword"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "read_file_content",
+            "description": "Read text content of a file.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {"type": "string"}
+                },
+                "required": ["file_path"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "execute_shell_command",
+            "description": "Execute a raw Windows PowerShell command. Use cautiously.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "command": {"type": "string"}
+                },
+                "required": ["command"]
+            }
+        }
+    },
+            
+    # --- 记忆与配置 ---
+    {
+        "type": "function",
+        "function": {
+            "name": "remember_user_fact",
+            "description": "Save a fact to long-term memory.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "key": {"type": "string"},
+                    "value": {"type": "string"}
+                },
+                "required": ["key", "value"]
+            }
+        }
+    }
+)
+
+# [新增] 哨兵系统工具定义是静态字面量，提升为模块级常量，不再每轮对话重新构建
+_SENTINEL_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "add_time_sentinel",
+            "description": "Set a timer trigger.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "interval": {"type": "integer"},
+                    "unit": {"type": "string", "enum": ["seconds", "minutes", "hours", "days"]},
+                    "description": {"type": "string"}
+                },
+                "required": ["interval", "unit", "description"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "add_file_sentinel",
+            "description": "Watch a file/folder for changes.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string"},
+                    "description": {"type": "string"}
+                },
+                "required": ["path", "description"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "add_behavior_sentinel",
+            "description": "Register global hotkey.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "key_combo": {"type": "string"},
+                    "description": {"type": "string"}
+                },
+                "required": ["key_combo", "description"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_active_sentinels",
+            "description": "List sentinels.",
+            "parameters": {"type": "object", "properties": {}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "remove_sentinel",
+            "description": "Remove sentinel.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string"},
+                    "id": {"type": "string"}
+                },
+                "required": ["type", "id"]
+            }
+        }
+    }
+]
 
 class Toolbox:
     def __init__(self, agent):
@@ -17,14 +454,94 @@ class Toolbox:
         self.agent = agent
         # [修改点] 初始化联网引擎
         self.web_engine = WebEngine()
+        # [新增] 启动时探测 ripgrep，可用时关键词搜索交给 rg (SIMD + 并行遍历)
+        self._rg_path = shutil.which('rg')
+        # [新增] 常驻 PowerShell 会话 (system.persistent_shell 开启时按需创建)
+        self._shell_session = None
+        self._shell_session_lock = threading.Lock()
+        # [新增] 用户画像延迟落盘：写操作只改内存并启动定时器，同一窗口内的多次写入合并为一次保存
+        # [修改点] 与 HostAgent 共用同一把配置锁 (可重入)，修改画像与其他线程的落盘 / 重新加载互斥
+        self._profile_lock = agent.config_lock
+        self._profile_flush_timer = None
+        # [新增] 内存中的画像有尚未落盘的修改 (不依赖内容摘要，摘要可能因配置重新加载而被重置)
+        self._profile_dirty = False
+        # [新增] 哨兵命令 / 技能管理动作的分发表 (哈希查找代替 if/elif 链)。
+        # sentinel_engine 由外部在 Toolbox 创建之后注入，因此在调用时再取
+        self._sentinel_dispatch = {
+            "add_time_sentinel": lambda k: self.agent.sentinel_engine.add_time_sentinel(k['interval'], k['unit'], k['description']),
+            "add_file_sentinel": lambda k: self.agent.sentinel_engine.add_file_sentinel(k['path'], k['description']),
+            "add_behavior_sentinel": lambda k: self.agent.sentinel_engine.add_behavior_sentinel(k['key_combo'], k['description']),
+            "list_active_sentinels": lambda k: json.dumps(self.agent.sentinel_engine.list_sentinels(), indent=2),
+            "remove_sentinel": lambda k: str(self.agent.sentinel_engine.remove_sentinel(k['type'], k['id'])),
+        }
+        self._skill_actions = {
+            "list_available": lambda name: self.agent.skill_manager.get_skill_index(),
+            "activate": self._activate_skill_action,
+            "deactivate_all": self._deactivate_skills_action,
+        }
+        # [新增] 工具定义缓存: (cache_key, tools)，仅在激活技能 / 技能注册表 / legacy 脚本变化时重建
+        self._tools_cache = None
+        # [新增] legacy 脚本缓存: (指纹, invoke_legacy_script 工具定义)。
+        # 指纹 (别名, 描述) 元组每轮都重新计算 (脚本通常只有几个)，与缓存一致时复用工具定义，
+        # 原地修改描述或替换别名也能正确失效
+        self._legacy_cache = None
+        # [新增] 目录树缓存 (LRU): (路径, recursive, depth) -> (((目录, mtime_ns), ...), 结果文本)
+        self._listing_cache = OrderedDict()
+
+    def invalidate_tool_cache(self):
+        """[新增] 丢弃工具定义相关缓存 (配置重新加载后由 HostAgent 调用)"""
+        self._tools_cache = None
+        self._legacy_cache = None
+
+    def _legacy_script_state(self):
+        """返回 (legacy 脚本指纹, invoke_legacy_script 工具定义或 None)，按指纹缓存"""
+        scripts = self.agent.config.get('scripts', {}) or {}
+        fingerprint = tuple((k, (v or {}).get('description', '')) for k, v in scripts.items())
+        cached = self._legacy_cache
+        if cached and cached[0] == fingerprint:
+            return cached
+
+        tool = None
+        if scripts:
+            scripts_desc = ", ".join([f"'{k}' ({desc})" for k, desc in fingerprint])
+            tool = {
+                "type": "function",
+                "function": {
+                    "name": "invoke_legacy_script",
+                    "description": f"Execute a pre-registered legacy automation script. Available: {scripts_desc}",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "alias": {"type": "string", "description": "The exact script alias name."},
+                            "args": {"type": "string", "description": "Optional arguments."}
+                        },
+                        "required": ["alias"]
+                    }
+                }
+            }
+        self._legacy_cache = (fingerprint, tool)
+        return fingerprint, tool
 
     def get_tool_definitions(self):
         """
         [Visibility Control] 动态返回工具定义。
         逻辑：Native Tools + (Active Skill Tools OR Discovery Tool)
         """
+        active_skill = getattr(self.agent, 'active_skill', None)
+        skill_manager = getattr(self.agent, 'skill_manager', None)
+        cache_key = (
+            active_skill,
+            getattr(skill_manager, 'registry_version', None),
+            self._legacy_script_state()[0],
+        )
+        cached = self._tools_cache
+        if cached and cached[0] == cache_key:
+            # 返回浅拷贝，调用方追加工具不会污染缓存
+            return list(cached[1])
+
         # 1. 始终可见的基础工具 (Native)
-        tools = self._get_native_tools()
+        # [修改点] 以工具名为键累积 (dict 保持插入顺序)，去重为 O(1) 的 setdefault，无需每次重建名称集合
+        tools_by_name = {t['function']['name']: t for t in self._get_native_tools()}
 
         # 2. [关键逻辑] 仅当 Skill 激活时，才暴露其专属工具
         if hasattr(self.agent, 'active_skill') and self.agent.active_skill:
@@ -32,296 +549,30 @@ class Toolbox:
             if res:
                 _, skill_tools = res
                 if skill_tools:
-                    # 避免重复添加：检查工具名是否已存在
-                    existing_names = {t['function']['name'] for t in tools if t['type'] == 'function'}
+                    # 避免重复添加：同名工具保留先出现的定义
                     for st in skill_tools:
-                        if st['function']['name'] not in existing_names:
-                            tools.append(st)
-        
+                        tools_by_name.setdefault(st['function']['name'], st)
 
-        return tools
+        tools = list(tools_by_name.values())
+        self._tools_cache = (cache_key, tools)
+        return list(tools)
     
     def _get_native_tools(self):
         # 1. 基础内置工具
-        tools = [
-            # --- Active Memory Tools (New) ---
-            {
-                "type": "function",
-                "function": {
-                    "name": "search_long_term_memory",
-                    "description": "Actively search the long-term vector database. Use this when you need to recall past projects, user preferences, or facts that are not in the current context.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "query": {"type": "string", "description": "The search query string."}
-                        },
-                        "required": ["query"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "add_long_term_memory",
-                    "description": "Explicitly save a new fact to long-term memory. Use this for important user instructions, project details, or learned solutions.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "text": {"type": "string", "description": "The content to remember."},
-                            "tag": {"type": "string", "description": "A short tag for categorization, e.g., 'project_info', 'user_preference', 'coding_rule'. Default: 'ai_note'."}
-                        },
-                        "required": ["text"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "delete_long_term_memory",
-                    "description": "Delete a specific memory entry by ID. Use 'search_long_term_memory' first to find the ID if needed.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "memory_id": {"type": "string", "description": "The UUID of the memory to delete."}
-                        },
-                        "required": ["memory_id"]
-                    }
-                }
-            },
-
-            # --- 技能管理 ---
-            {
-                "type": "function",
-                "function": {
-                    "name": "manage_skills",
-                    "description": "Manage AI Skills. Use 'list_available' to see the index of skills. Use 'activate' to load a specific skill's SOP and tools.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "action": {"type": "string", "enum": ["list_available", "activate", "deactivate_all"]},
-                            "skill_name": {"type": "string", "description": "Required if action is 'activate'."}
-                        },
-                        "required": ["action"]
-                    }
-                }
-            },
-            # --- 核心能力 ---
-            {
-                "type": "function",
-                "function": {
-                    "name": "browse_url",
-                    "description": "Visit a specific URL and extract its text content. Use this with URLs.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "url": {
-                                "type": "string",
-                                "description": "The URL to visit (must start with http/https)."
-                            }
-                        },
-                        "required": ["url"]
-                    }
-                }
-            },
-            
-            # --- [新增] 技能学习能力 ---
-            {
-                "type": "function",
-                "function": {
-                    "name": "learn_new_skill",
-                    "description": "Dynamically learn a new skill from a GitHub URL or local path. Use this when the user asks you to 'learn' something or provides a link to an MCP tool/python script.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "url_or_path": {
-                                "type": "string",
-                                "description": "The GitHub URL (starts with http) or absolute local file path to the skill folder."
-                            }
-                        },
-                        "required": ["url_or_path"]
-                    }
-                }
-            },
-
-            # --- 文件系统能力 ---
-            {
-                "type": "function",
-                "function": {
-                    "name": "list_directory_files",
-                    "description": "List files in a directory recursively. Use this to understand project structure or find specific files.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "directory_path": {"type": "string", "description": "The absolute path."},
-                            "recursive": {"type": "boolean", "description": "Default True."},
-                            "depth": {"type": "integer", "description": "Max depth (default 2)."}
-                        },
-                        "required": ["directory_path"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "search_files_by_keyword",
-                    "description": "Grep search inside files.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "directory_path": {"type": "string"},
-                            "keyword": {"type": "string"}
-                        },
-                        "required": ["directory_path", "keyword"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "read_file_content",
-                    "description": "Read text content of a file.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "file_path": {"type": "string"}
-                        },
-                        "required": ["file_path"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "execute_shell_command",
-                    "description": "Execute a raw Windows PowerShell command. Use cautiously.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "command": {"type": "string"}
-                        },
-                        "required": ["command"]
-                    }
-                }
-            },
-            
-            # --- 记忆与配置 ---
-            {
-                "type": "function",
-                "function": {
-                    "name": "remember_user_fact",
-                    "description": "Save a fact to long-term memory.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "key": {"type": "string"},
-                            "value": {"type": "string"}
-                        },
-                        "required": ["key", "value"]
-                    }
-                }
-            }
-        ]
+        tools = list(_NATIVE_TOOL_SCHEMA)
 
         # 2. 动态加载 Legacy Scripts (config.yaml)
-        available_scripts = self.agent.config.get('scripts', {})
-        if available_scripts:
-            scripts_desc = ", ".join([f"'{k}' ({v.get('description', '')})" for k, v in available_scripts.items()])
-            tools.append({
-                "type": "function",
-                "function": {
-                    "name": "invoke_legacy_script",
-                    "description": f"Execute a pre-registered legacy automation script. Available: {scripts_desc}",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "alias": {"type": "string", "description": "The exact script alias name."},
-                            "args": {"type": "string", "description": "Optional arguments."}
-                        },
-                        "required": ["alias"]
-                    }
-                }
-            })
-
+        # [修改点] 描述字符串按配置缓存，只在 scripts 变化后重新拼接
+        _, legacy_tool = self._legacy_script_state()
+        if legacy_tool:
+            tools.append(legacy_tool)
 
         # 4. 哨兵系统工具
-        tools.extend(self._get_sentinel_tools())
+        tools.extend(_SENTINEL_TOOLS)
 
 
         return tools
 
-    def _get_sentinel_tools(self):
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": "add_time_sentinel",
-                    "description": "Set a timer trigger.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "interval": {"type": "integer"},
-                            "unit": {"type": "string", "enum": ["seconds", "minutes", "hours", "days"]},
-                            "description": {"type": "string"}
-                        },
-                        "required": ["interval", "unit", "description"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "add_file_sentinel",
-                    "description": "Watch a file/folder for changes.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "path": {"type": "string"},
-                            "description": {"type": "string"}
-                        },
-                        "required": ["path", "description"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "add_behavior_sentinel",
-                    "description": "Register global hotkey.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "key_combo": {"type": "string"},
-                            "description": {"type": "string"}
-                        },
-                        "required": ["key_combo", "description"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "list_active_sentinels",
-                    "description": "List sentinels.",
-                    "parameters": {"type": "object", "properties": {}}
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "remove_sentinel",
-                    "description": "Remove sentinel.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "type": {"type": "string"},
-                            "id": {"type": "string"}
-                        },
-                        "required": ["type", "id"]
-                    }
-                }
-            }
-        ]
-
     # --- Active Memory Implementations ---
     def search_long_term_memory(self, query):
         """主动搜索记忆"""
@@ -352,20 +603,20 @@ class Toolbox:
         """
         认知负荷管理工具的实现。
         """
-        if action == "list_available":
-            return self.agent.skill_manager.get_skill_index()
-        
-        elif action == "activate":
-            if not skill_name:
-                return "Error: skill_name is required for activation."
-            # 调用 Agent 的方法来改变状态 (HostAgent 会处理 SOP 注入)
-            return self.agent.activate_skill(skill_name)
-            
-        elif action == "deactivate_all":
-            self.agent.active_skill = None
-            return "All skills deactivated. Context cleaned."
-            
-        return "Unknown action."
+        handler = self._skill_actions.get(action)
+        if handler is None:
+            return "Unknown action."
+        return handler(skill_name)
+
+    def _activate_skill_action(self, skill_name):
+        if not skill_name:
+            return "Error: skill_name is required for activation."
+        # 调用 Agent 的方法来改变状态 (HostAgent 会处理 SOP 注入)
+        return self.agent.activate_skill(skill_name)
+
+    def _deactivate_skills_action(self, skill_name=None):
+        self.agent.active_skill = None
+        return "All skills deactivated. Context cleaned."
 
     def route_skill_tool(self, tool_name, args):
         """
@@ -388,12 +639,86 @@ class Toolbox:
         return self.agent.skill_manager.learn_skill(url_or_path)
 
     def _safe_decode(self, byte_data):
-        """安全解码函数"""
+        """
+        安全解码函数
+        [修改点] 先按 BOM 确定编码；否则严格 UTF-8 解码一次，失败后 GBK (errors='replace') 一次收尾，
+        最多两轮解码，不再有第三轮 UTF-8 ignore 回退
+        [修改点] 纯 ASCII 输出 (绝大多数命令输出) 走快速路径：bytes.isascii() 是 C 层的整块扫描，
+        随后按 ASCII 解码，跳过 UTF-8 校验状态机 (BOM 本身含非 ASCII 字节，不受影响)
+        """
         if not byte_data: return ""
+        if byte_data.isascii():
+            return byte_data.decode('ascii')
+        bom_encoding = _bom_encoding(byte_data)
+        if bom_encoding:
+            return byte_data.decode(bom_encoding, errors='replace')
         try: return byte_data.decode('utf-8')
-        except: 
-            try: return byte_data.decode('gbk')
-            except: return byte_data.decode('utf-8', errors='ignore')
+        except UnicodeDecodeError:
+            return byte_data.decode('gbk', errors='replace')
+
+    def _drain_pipe(self, pipe, sink):
+        """
+        [新增] 按行读取子进程输出到有界 deque。超过 SHELL_OUTPUT_MAX_BYTES 时丢弃最早的行并标记截断，
+        但仍持续读到 EOF，保证子进程不会因管道写满而阻塞。
+        """
+        try:
+            for line in iter(lambda: pipe.readline(SHELL_READ_CHUNK), b''):
+                sink['lines'].append(line)
+                sink['size'] += len(line)
+                while sink['size'] > SHELL_OUTPUT_MAX_BYTES and len(sink['lines']) > 1:
+                    sink['size'] -= len(sink['lines'].popleft())
+                    sink['truncated'] = True
+        except (OSError, ValueError):
+            pass
+        finally:
+            pipe.close()
+
+    def _get_shell_session(self):
+        """
+        [新增] 返回常驻 PowerShell 会话；未在 config.yaml 中开启 system.persistent_shell 时返回 None。
+        """
+        if not self.agent.config.get('system', {}).get('persistent_shell', False):
+            return None
+        with self._shell_session_lock:
+            if self._shell_session is None:
+                self._shell_session = PersistentShell(self._safe_decode, SHELL_OUTPUT_MAX_BYTES)
+            return self._shell_session
+
+    def close(self):
+        """[新增] 释放常驻资源 (服务关闭时调用)，并立即落盘尚未保存的用户画像"""
+        self.flush_profile()
+        if self._shell_session is not None:
+            self._shell_session.close()
+        self.web_engine.close()
+
+    def _schedule_profile_flush(self):
+        """[新增] (重新) 启动画像落盘定时器；调用方需持有 _profile_lock"""
+        if self._profile_flush_timer is not None:
+            self._profile_flush_timer.cancel()
+        self._profile_flush_timer = threading.Timer(PROFILE_FLUSH_DELAY, self.flush_profile)
+        self._profile_flush_timer.daemon = True
+        self._profile_flush_timer.start()
+
+    def flush_profile(self):
+        """
+        [新增] 立即保存尚未落盘的用户画像 (定时器到期、服务关闭、HostAgent 重新加载配置前调用)。
+        [修改点] 以 _profile_dirty 判断是否需要写入并强制落盘，不再依赖内容摘要：
+        摘要会在 load_all_configs 时按内存数据重置，可能把未保存的修改误判为"无变化"
+        """
+        with self._profile_lock:
+            if self._profile_flush_timer is not None:
+                self._profile_flush_timer.cancel()
+                self._profile_flush_timer = None
+            if not self._profile_dirty:
+                return
+            try:
+                # [修改点] 走 HostAgent.save_user_profile (libyaml C Dumper + 原子写入)
+                # [修改点] 画像不影响 LLM 客户端 (只取决于 active_profile)，落盘后无需 _init_client
+                self.agent.save_user_profile(force=True)
+                self._profile_dirty = False
+            except Exception as e:
+                # 保持 dirty，下一次 flush_profile 重试
+                print(f"[Profile Error]: Failed to save user profile: {e}")
 
     def execute_shell(self, command, cwd=None, timeout=120, stop_event=None):
         """
@@ -410,48 +735,91 @@ class Toolbox:
             if stop_event and stop_event.is_set():
                 return "[System]: Command cancelled before execution."
 
+            # [新增] 开启常驻会话时复用同一个 PowerShell 进程；会话忙 (并发调用) 或不可用时回退到一次性进程
+            session = self._get_shell_session()
+            if session is not None:
+                session_result = session.run(command, cwd=cwd, timeout=timeout, stop_event=stop_event)
+                if session_result is not None:
+                    status, output, truncated = session_result
+                    if status == "interrupted":
+                        return "[System]: Command execution was interrupted by user."
+                    if status == "timeout":
+                        return f"[Error]: Command timed out after {timeout}s."
+                    if truncated:
+                        output = f"[System]: Output truncated, showing the last {SHELL_OUTPUT_MAX_BYTES // 1024} KB.\n" + output
+                    if not output.strip():
+                        return "[System]: Command executed successfully (No visual output)."
+                    return output
+
             # 使用 Popen 启动进程
             process = subprocess.Popen(
                 ["powershell", "-Command", command],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 cwd=cwd,
-                creationflags=subprocess.CREATE_NO_WINDOW,
+                # [修改点] 独立进程组/会话，超时或中断时可以连同子进程一起结束
+                creationflags=PROCESS_CREATION_FLAGS,
+                start_new_session=True,
                 env=env
             )
             
-            start_time = time.time()
-            
-            # 轮询检查循环
-            while True:
-                # 1. 检查是否被中断 (Robust Interrupt)
-                if stop_event and stop_event.is_set():
-                    process.kill()
-                    return "[System]: Command execution was interrupted by user."
-                
-                # 2. 检查是否超时
-                if time.time() - start_time > timeout:
-                    process.kill()
-                    return f"[Error]: Command timed out after {timeout}s."
-                
-                # 3. 检查进程是否结束
-                retcode = process.poll()
-                if retcode is not None:
-                    break
-                
-                # 避免 CPU 空转
-                time.sleep(0.1)
-            
-            # 获取输出
-            stdout_data, stderr_data = process.communicate()
+            # [修改点] 不再 sleep(0.1) 轮询：两个读取线程按行把 stdout/stderr 排空到有界缓冲 (内存占用有上限，
+            # 也不会因管道写满卡死)，守护线程监听 stop_event；主线程只等待 finished，
+            # 命令结束 / 用户中断 / 超时三者先到先返回
+            finished = threading.Event()
+            result = {}
+            sinks = [{'lines': deque(), 'size': 0, 'truncated': False} for _ in range(2)]
+            readers = [
+                threading.Thread(target=self._drain_pipe, args=(pipe, sink), daemon=True)
+                for pipe, sink in zip((process.stdout, process.stderr), sinks)
+            ]
+            for reader in readers:
+                reader.start()
+
+            def _collect_output():
+                try:
+                    for reader in readers:
+                        reader.join()
+                    process.wait()
+                    result['output'] = sinks
+                except Exception as e:
+                    result['error'] = e
+                finally:
+                    finished.set()
+
+            threading.Thread(target=_collect_output, daemon=True).start()
+
+            if stop_event:
+                def _watch_interrupt():
+                    # 定期醒来只为在命令结束后让线程退出，中断本身是即时响应的
+                    while not finished.is_set():
+                        if stop_event.wait(0.5):
+                            finished.set()
+                            return
+
+                threading.Thread(target=_watch_interrupt, daemon=True).start()
+
+            if not finished.wait(timeout):
+                kill_process_tree(process)
+                return f"[Error]: Command timed out after {timeout}s."
+
+            if 'output' not in result:
+                if 'error' in result:
+                    raise result['error']
+                kill_process_tree(process)
+                return "[System]: Command execution was interrupted by user."
+
+            out_sink, err_sink = result['output']
             
             # 手动安全解码
-            stdout_str = self._safe_decode(stdout_data)
-            stderr_str = self._safe_decode(stderr_data)
+            stdout_str = self._safe_decode(b''.join(out_sink['lines']))
+            stderr_str = self._safe_decode(b''.join(err_sink['lines']))
             
             output = stdout_str
             if stderr_str:
                 output += f"\n[STDERR]: {stderr_str}"
+            if out_sink['truncated'] or err_sink['truncated']:
+                output = f"[System]: Output truncated, showing the last {SHELL_OUTPUT_MAX_BYTES // 1024} KB per stream.\n" + output
             
             if not output.strip():
                 return "[System]: Command executed successfully (No visual output)."
@@ -478,8 +846,7 @@ class Toolbox:
             log_dir = self.agent.config.get('system', {}).get('log_dir', './logs')
             # 构造 workspace 路径
             workspace_dir = os.path.abspath(os.path.join(log_dir, 'workspace'))
-            if not os.path.exists(workspace_dir):
-                os.makedirs(workspace_dir, exist_ok=True)
+            os.makedirs(workspace_dir, exist_ok=True)
             
             cwd = workspace_dir
             # print(f"[System]: Skill execution redirected to workspace: {cwd}")
@@ -493,10 +860,12 @@ class Toolbox:
         delay_sec = script_info.get('delay', 0)
         if delay_sec and delay_sec > 0:
             # 支持延迟期间中断
-            for _ in range(int(delay_sec * 10)):
-                if stop_event and stop_event.is_set(): 
+            # [修改点] 直接阻塞在 stop_event.wait(delay) 上：中断即时返回，不再每 100ms 醒来一次
+            if stop_event:
+                if stop_event.wait(delay_sec):
                     return "[System]: Skill delayed execution interrupted."
-                time.sleep(0.1)
+            else:
+                time.sleep(delay_sec)
             
         # 获取超时配置
         timeout_sec = script_info.get('timeout', 120)
@@ -506,41 +875,103 @@ class Toolbox:
     # [修改点] 增强文件读取逻辑
     def read_file_content(self, file_path):
         """读取文件内容，带安全限制与多编码尝试"""
-        if not os.path.exists(file_path):
+        # [修改点] 一次 os.stat 同时完成存在性检查与取 mtime/size，不再 exists + stat 两次系统调用
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
             return f"Error: File '{file_path}' does not exist."
+        except OSError as e:
+            return f"Error reading file: {str(e)}"
+        if stat.S_ISDIR(st.st_mode):
+            return f"Error: '{file_path}' is a directory. Use 'list_directory_files' instead."
             
         # 简单判断是否是常见的二进制文件
         ext = os.path.splitext(file_path)[1].lower()
-        binary_exts = ['.exe', '.dll', '.png', '.jpg', '.zip', '.pdf', '.docx']
-        if ext in binary_exts:
+        if ext in READ_BINARY_EXTS:
              return f"[System Warning]: File '{os.path.basename(file_path)}' appears to be binary or requires special parsing ({ext}). Reading raw text is skipped."
 
-        MAX_SIZE = 50 * 1024 # 50KB Limit
         try:
-            file_size = os.path.getsize(file_path)
-            content = ""
-            
-            # 尝试 UTF-8
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    if file_size > MAX_SIZE:
-                        content = f.read(MAX_SIZE)
-                        content += f"\n\n[System Warning]: File content truncated (Size: {file_size} bytes). Read first {MAX_SIZE} bytes."
-                    else:
-                        content = f.read()
-            except UnicodeDecodeError:
-                # 失败则尝试 GBK
-                with open(file_path, 'r', encoding='gbk', errors='replace') as f:
-                    if file_size > MAX_SIZE:
-                        content = f.read(MAX_SIZE)
-                        content += f"\n\n[System Warning]: File content truncated. (Read with GBK fallback)"
-                    else:
-                        content = f.read()
-            
-            return content
+            # [修改点] 以 (路径, mtime, 大小) 为键走 LRU 缓存，重复读取同一未修改文件时免去磁盘 I/O 与解码
+            return _read_text_cached(os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
         except Exception as e:
             return f"Error reading file: {str(e)}"
 
+    @staticmethod
+    def _scan_tree_level(current_dir, visited=None):
+        """
+        [新增] 读取单个目录，返回排序后的 [(名称, 路径, 是否目录)] (文件夹在前，文件在后)；读取失败时抛出异常。
+        传入 visited 列表时，记录该目录及其 mtime_ns (供结果缓存校验)。
+        """
+        if visited is not None:
+            # 读目录前取 mtime：此后的增删改名都会使缓存校验失败
+            visited.append((current_dir, os.stat(current_dir).st_mtime_ns))
+
+        # [修改点] os.scandir 的 DirEntry 自带目录项类型 (d_type)，is_dir() 对普通条目无需额外 stat；
+        # 忽略名单在读目录时就过滤掉，不参与排序；末项的 └── 连接符也因此落在真正显示的最后一项上
+        entries = []
+        with os.scandir(current_dir) as it:
+            for e in it:
+                if e.name in LIST_IGNORE_DIRS:
+                    continue
+                try:
+                    is_dir = e.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir and os.path.splitext(e.name)[1].lower() in LIST_IGNORE_EXTS:
+                    continue
+                entries.append((e.name, e.path, is_dir))
+        entries.sort(key=lambda x: (not x[2], x[0].lower()))
+        return entries
+
+    @staticmethod
+    def _iter_tree(root_dir, recursive, depth, visited=None):
+        """
+        [新增] 按树状格式逐行产出目录结构，产出 (行文本, 是否文件)。
+        生成器按需读取目录，调用方停止消费后剩余目录不会被扫描。
+        [修改点] 递归改为显式栈迭代 (每层保存条目迭代器)，输出仍为深度优先的先序；
+        深层目录不再受递归深度限制，也省去逐层的生成器委托开销
+        """
+        if depth < 0:
+            return
+
+        # 栈元素: (条目迭代器, 末项序号, 当前深度, 前缀)
+        stack = []
+        pending = (root_dir, 0, "")
+        while True:
+            if pending is not None:
+                current_dir, current_depth, prefix = pending
+                pending = None
+                try:
+                    entries = Toolbox._scan_tree_level(current_dir, visited)
+                except Exception as e:
+                    if visited is not None:
+                        # 读取失败的目录不参与缓存：mtime 记为 None，校验永远不通过
+                        visited.append((current_dir, None))
+                    yield f"{prefix}[Permission Denied: {e}]", False
+                else:
+                    stack.append((enumerate(entries), len(entries) - 1, current_depth, prefix))
+
+            if not stack:
+                return
+
+            it, last_index, current_depth, prefix = stack[-1]
+            item = next(it, None)
+            if item is None:
+                stack.pop()
+                continue
+
+            i, (entry, full_path, is_dir) = item
+            is_last = (i == last_index)
+            connector = "└── " if is_last else "├── "
+
+            if is_dir:
+                yield f"{prefix}{connector}📂 {entry}/", False
+                # 如果允许递归且未达深度限制，下一轮先展开该子目录
+                if recursive and current_depth < depth:
+                    pending = (full_path, current_depth + 1, prefix + ("    " if is_last else "│   "))
+            else:
+                yield f"{prefix}{connector}📄 {entry}", True
+
     # [新增] 目录列表工具
     # [修改后] 增强版目录列表工具：支持树状结构显示，确保文件夹不遗漏
     def list_directory_files(self, directory_path, recursive=True, depth=2):
@@ -550,122 +981,90 @@ class Toolbox:
         :param recursive: 是否递归遍历
         :param depth: 递归深度限制
         """
-        if not os.path.exists(directory_path):
+        # [修改点] 单次 os.stat 同时判断存在与是否为目录
+        try:
+            is_dir = stat.S_ISDIR(os.stat(directory_path).st_mode)
+        except OSError:
             return f"Error: Directory '{directory_path}' does not exist."
 
-        if not os.path.isdir(directory_path):
+        if not is_dir:
             return f"Error: '{directory_path}' is not a directory."
 
-        # 忽略列表
-        IGNORE_DIRS = {'.git', '.idea', '.vscode', '__pycache__', 'node_modules', 'venv', '.obsidian'}
-        IGNORE_EXTS = {'.exe', '.dll', '.so', '.dylib', '.class', '.pyc', '.png', '.jpg', '.jpeg', '.zip', '.tar', '.gz'}
-
-        results = []
-        self.file_count = 0
-        self.max_files_limit = 150  # 适当增加上限，防止遗漏关键结构
-
-        def _build_tree(current_dir, current_depth, prefix=""):
-            if current_depth > depth:
-                return
-
+        # [新增] 命中缓存且所读目录的 mtime 均未变化 (目录项增删改名都会更新 mtime) 时直接返回，
+        # 只需对每个目录 stat 一次，免去重新列目录与排序
+        cache_key = (os.path.abspath(directory_path), bool(recursive), depth)
+        cached = self._listing_cache.get(cache_key)
+        if cached is not None:
             try:
-                # 获取目录下所有项并排序（文件夹在前，文件在后）
-                entries = os.listdir(current_dir)
-                entries.sort(key=lambda x: (not os.path.isdir(os.path.join(current_dir, x)), x.lower()))
-            except Exception as e:
-                results.append(f"{prefix}[Permission Denied: {e}]")
-                return
-
-            for i, entry in enumerate(entries):
-                if self.file_count >= self.max_files_limit:
-                    if i == 0: results.append(f"{prefix}... [Output truncated due to limit]")
-                    break
+                if all(os.stat(d).st_mtime_ns == m for d, m in cached[0]):
+                    self._listing_cache.move_to_end(cache_key)
+                    return cached[1]
+            except OSError:
+                pass
 
-                full_path = os.path.join(current_dir, entry)
-                is_last = (i == len(entries) - 1)
-                connector = "└── " if is_last else "├── "
-                
-                # 检查是否在忽略名单
-                if entry in IGNORE_DIRS:
-                    continue
-
-                if os.path.isdir(full_path):
-                    # 添加文件夹标识
-                    results.append(f"{prefix}{connector}📂 {entry}/")
-                    
-                    # 如果允许递归且未达深度限制，继续向下走
-                    if recursive and current_depth < depth:
-                        new_prefix = prefix + ("    " if is_last else "│   ")
-                        _build_tree(full_path, current_depth + 1, new_prefix)
-                else:
-                    # 检查文件后缀过滤
-                    ext = os.path.splitext(entry)[1].lower()
-                    if ext in IGNORE_EXTS:
-                        continue
-                        
-                    results.append(f"{prefix}{connector}📄 {entry}")
-                    self.file_count += 1
-
-        # 开始构建
-        results.append(f"📂 {directory_path}")
-        _build_tree(directory_path, 0)
+        # [修改点] 目录树改由生成器逐行产出，这里边消费边计数，达到文件数或字符预算即停止，
+        # 后续目录不再被读取；计数器是本次调用的局部变量，并发调用互不干扰
+        results = [f"📂 {directory_path}"]
+        file_count = 0
+        char_count = len(results[0])
+        visited = []
+        for line, is_file in self._iter_tree(directory_path, recursive, depth, visited=visited):
+            if file_count >= LIST_MAX_FILES or char_count >= LIST_MAX_CHARS:
+                results.append("... [Output truncated due to limit]")
+                break
+            results.append(line)
+            char_count += len(line) + 1
+            if is_file:
+                file_count += 1
 
         if len(results) <= 1:
             return f"Directory '{directory_path}' is empty or contains only ignored items."
 
-        return "\n".join(results)
+        result = "\n".join(results)
+        self._listing_cache[cache_key] = (tuple(visited), result)
+        self._listing_cache.move_to_end(cache_key)
+        while len(self._listing_cache) > LIST_CACHE_SIZE:
+            self._listing_cache.popitem(last=False)
+        return result
 
     # [新增] 关键词搜索工具
     def search_files_by_keyword(self, directory_path, keyword, stop_event=None):
         """
-        简单粗暴的 grep 逻辑：遍历目录下所有文本文件，查找包含 keyword 的文件。
+        关键词搜索：优先调用 ripgrep，未安装或调用失败时回退到 Python 遍历。
         [修改点] 支持 stop_event 中断
         """
-        if not os.path.exists(directory_path):
+        # [修改点] 单次 os.stat 同时判断存在与是否为目录 (后者决定能否使用 trigram 索引)
+        try:
+            is_dir = stat.S_ISDIR(os.stat(directory_path).st_mode)
+        except OSError:
             return f"Error: Path '{directory_path}' not found."
 
-        found_files = []
-        scanned_count = 0
-        MAX_SCAN = 50 # 限制扫描文件数，防止性能卡顿
-        
-        # 忽略配置
-        IGNORE_DIRS = {'.git', '.obsidian', 'node_modules', '__pycache__'}
-        TEXT_EXTS = {'.md', '.txt', '.py', '.json', '.yaml', '.csv', '.log', '.xml', '.html', '.css', '.js'}
-
-        for root, dirs, files in os.walk(directory_path):
-            if stop_event and stop_event.is_set():
+        found_files = None
+        if self._rg_path:
+            found_files = self._search_with_rg(directory_path, keyword, stop_event)
+            if found_files == "interrupted":
                 return "[System]: Search interrupted."
+            scanned_note = "ripgrep"
 
-            dirs[:] = [d for d in dirs if d not in IGNORE_DIRS]
-            
-            for file in files:
-                if stop_event and stop_event.is_set():
+        if found_files is None and is_dir:
+            # [新增] 无 ripgrep 时优先走持久化 trigram 索引 (增量刷新 + 候选预筛选)
+            indexed = self._search_with_index(directory_path, keyword, stop_event)
+            if indexed == "interrupted":
+                return "[System]: Search interrupted."
+            if indexed is not None:
+                found_files, scanned_count = indexed
+                if found_files is None:
                     return "[System]: Search interrupted."
+                scanned_note = f"Indexed search, verified {scanned_count} candidate files"
+
+        if found_files is None:
+            found_files, scanned_count = self._search_with_python(directory_path, keyword, stop_event)
+            if found_files is None:
+                return "[System]: Search interrupted."
+            scanned_note = f"Scanned {scanned_count} files"
 
-                if scanned_count > MAX_SCAN:
-                    break
-                    
-                ext = os.path.splitext(file)[1].lower()
-                if ext not in TEXT_EXTS:
-                    continue
-                
-                full_path = os.path.join(root, file)
-                scanned_count += 1
-                
-                # 尝试读取并查找
-                try:
-                    with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        if keyword.lower() in content.lower():
-                            found_files.append(full_path)
-                except:
-                    pass
-            
-            if scanned_count > MAX_SCAN:
-                break
-        
         if not found_files:
-            return f"{directory_path}: No files found containing '{keyword}' (Scanned {scanned_count} files)."
+            return f"{directory_path}: No files found containing '{keyword}' ({scanned_note})."
         
         # 返回结果列表
         result_text = f"Found '{keyword}' in the following files:\n"
@@ -674,36 +1073,222 @@ class Toolbox:
         result_text += "\n(You can now use 'read_file_content' to read specific files from this list.)"
         return result_text
 
+    def _search_with_rg(self, directory_path, keyword, stop_event=None):
+        """
+        [新增] 使用 ripgrep 搜索 (固定字符串、忽略大小写、只列文件名)。
+        返回命中文件列表；被中断时返回 "interrupted"；rg 出错时返回 None 以便回退。
+        """
+        cmd = [self._rg_path, *_RG_BASE_ARGS, '--', keyword, directory_path]
+
+        try:
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+            )
+        except OSError:
+            return None
+
+        # 中断监听：stop_event 触发时直接结束 rg 进程
+        done = threading.Event()
+        interrupted = threading.Event()
+        if stop_event:
+            def _watch_interrupt():
+                while not done.is_set():
+                    if stop_event.wait(0.5):
+                        if not done.is_set():
+                            interrupted.set()
+                            process.kill()
+                        return
+
+            threading.Thread(target=_watch_interrupt, daemon=True).start()
+
+        try:
+            stdout_data, _ = process.communicate(timeout=RG_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            stdout_data, _ = process.communicate()
+        finally:
+            done.set()
+
+        if interrupted.is_set():
+            return "interrupted"
+        # rg 退出码：0 有命中，1 无命中，2 出错 (出错但已有部分结果时仍采用)
+        if process.returncode not in (0, 1) and not stdout_data:
+            return None
+
+        lines = self._safe_decode(stdout_data).splitlines()
+        return [line for line in lines if line][:RG_MAX_RESULTS]
+
+    @staticmethod
+    def _make_needle(keyword):
+        """
+        [新增] 预处理搜索关键词 (只计算一次)。
+        [修改点] 可在原始字节上匹配的关键词 (ASCII，或非 ASCII 部分不区分大小写，如中文) 预编译为
+        忽略大小写的 bytes 正则 (按 UTF-8 编码)，直接扫描文件字节；
+        其余关键词 (含非 ASCII 的大小写字母) 保留小写 str，走按行解码匹配 (bytes 正则只折叠 ASCII 大小写)。
+        """
+        if all(c.isascii() or c.lower() == c.upper() for c in keyword):
+            return re.compile(re.escape(keyword.encode('utf-8')), re.IGNORECASE)
+        return keyword.lower()
+
+    @staticmethod
+    def _file_contains(full_path, needle):
+        """流式匹配，命中即停止读取；不再整文件 read() + 整体 lower() 复制两份"""
+        try:
+            if isinstance(needle, re.Pattern):
+                # [修改点] 预编译正则直接扫描原始字节，不再生成小写副本：小文件一次读入；
+                # 大文件用只读 mmap，由操作系统按页调入 (空文件走小文件分支，避免 mmap 长度 0 报错)
+                with open(full_path, 'rb') as f:
+                    if os.fstat(f.fileno()).st_size < SEARCH_MMAP_MIN:
+                        return needle.search(f.read()) is not None
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        return needle.search(mm) is not None
+            else:
+                with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    for line in f:
+                        if needle in line.lower():
+                            return True
+        except:
+            pass
+        return False
+
+    def _search_with_python(self, directory_path, keyword, stop_event=None):
+        """
+        简单粗暴的 grep 逻辑：遍历目录下所有文本文件，查找包含 keyword 的文件。
+        返回 (命中文件列表, 已扫描文件数)；被中断时返回 (None, 已扫描文件数)。
+        [修改点] 遍历与匹配流水线化：目录遍历作为生产者逐个产出候选文件，线程池边遍历边读取匹配
+        """
+        def _iter_candidates():
+            # [修改点] os.walk 换成 scandir 生成器：忽略目录在条目层面跳过，凑够上限即停止遍历
+            count = 0
+            for full_path in _walk_scandir(directory_path, SEARCH_IGNORE_DIRS):
+                if os.path.splitext(full_path)[1].lower() in SEARCH_TEXT_EXTS:
+                    yield full_path
+                    count += 1
+                    if count >= SEARCH_MAX_SCAN:
+                        return
+
+        return self._match_candidates(_iter_candidates(), self._make_needle(keyword), stop_event)
+
+    def _match_candidates(self, candidates, needle, stop_event=None, max_results=None):
+        """
+        用线程池并发校验候选文件，结果按候选顺序收集。
+        candidates 可以是惰性迭代器：同时在途的任务数有上限 (有界队列)，
+        生产者 (目录遍历) 与消费者 (文件读取匹配) 相互重叠；每取一个候选都检查中断。
+        返回 (命中文件列表, 已校验文件数)；被中断时返回 (None, 已校验文件数)。
+        """
+        found_files = []
+        scanned_count = 0
+        max_pending = SEARCH_WORKERS * 4
+        pending = deque()
+
+        def _cancel_pending():
+            for _, future in pending:
+                future.cancel()
+
+        with ThreadPoolExecutor(max_workers=SEARCH_WORKERS) as pool:
+            candidates = iter(candidates)
+            exhausted = False
+            while True:
+                # 补充在途任务直到上限 (或候选耗尽)
+                while not exhausted and len(pending) < max_pending:
+                    if stop_event and stop_event.is_set():
+                        _cancel_pending()
+                        return None, scanned_count
+                    path = next(candidates, None)
+                    if path is None:
+                        exhausted = True
+                        break
+                    pending.append((path, pool.submit(self._file_contains, path, needle)))
+
+                if not pending:
+                    break
+
+                # 按顺序取回最早提交的结果
+                path, future = pending.popleft()
+                if stop_event and stop_event.is_set():
+                    future.cancel()
+                    _cancel_pending()
+                    return None, scanned_count
+                if future.result():
+                    found_files.append(path)
+                scanned_count += 1
+                if max_results and len(found_files) >= max_results:
+                    _cancel_pending()
+                    return found_files, scanned_count
+
+        return found_files, scanned_count
+
+    def _search_with_index(self, directory_path, keyword, stop_event=None):
+        """
+        [新增] 基于 trigram 索引的搜索：增量刷新索引 -> 取候选文件 -> 逐行校验。
+        返回 (命中文件列表, 已校验数)；被中断时返回 "interrupted"；
+        关键词过短、索引不可用或尚未建完 (首次建索引按批分摊到多次搜索) 时返回 None，交由有上限的逐文件扫描处理。
+        """
+        if len(keyword) < 3:
+            return None
+
+        log_dir = self.agent.config.get('system', {}).get('log_dir', './logs')
+        cache_dir = os.path.join(log_dir, 'workspace', TRIGRAM_CACHE_DIRNAME)
+        try:
+            with TrigramIndex(directory_path, index_path_for(cache_dir, directory_path),
+                              SEARCH_IGNORE_DIRS, SEARCH_TEXT_EXTS) as index:
+                refreshed = index.refresh(stop_event)
+                if refreshed is None:
+                    return "interrupted"
+                if not refreshed[2]:
+                    return None
+                candidates = index.candidates(keyword)
+        except (sqlite3.Error, OSError) as e:
+            print(f"[Search Warning]: Trigram index unavailable, falling back to scan: {e}")
+            return None
+
+        if candidates is None:
+            return None
+        return self._match_candidates(candidates, self._make_needle(keyword), stop_event, max_results=RG_MAX_RESULTS)
+
     def scan_and_remember(self, target_path, scan_type="projects"):
         """扫描文件夹并记忆路径"""
         try:
-            if not os.path.exists(target_path):
-                return f"Error: Path '{target_path}' does not exist."
-
             found_items = {}
             if scan_type == "projects":
                 # 只扫描一级子目录
-                subdirs = [os.path.join(target_path, d) for d in os.listdir(target_path) if os.path.isdir(os.path.join(target_path, d))]
-                
-                for d in subdirs:
-                    dir_name = os.path.basename(d)
-                    if any(os.path.exists(os.path.join(d, marker)) for marker in ['.git', 'package.json', 'requirements.txt', 'pom.xml', '.obsidian']):
-                        found_items[dir_name] = d
-                
-                # 更新 Agent 的 user_data
-                if 'known_projects' not in self.agent.user_data:
-                    self.agent.user_data['known_projects'] = {}
-                
-                self.agent.user_data['known_projects'].update(found_items)
+                # [修改点] scandir 直接得到目录项类型；每个子目录只列一次目录并与标记集合求交，
+                # 取代最多 5 次 os.path.exists；子目录之间用线程池并发 (慢速/网络盘上收益明显)
+                # [修改点] 不再预先 os.path.exists：路径不存在时 scandir 直接抛出 FileNotFoundError
+                try:
+                    with os.scandir(target_path) as it:
+                        subdirs = [(e.name, e.path) for e in it if e.is_dir()]
+                except FileNotFoundError:
+                    return f"Error: Path '{target_path}' does not exist."
+
+                def _has_marker(path):
+                    try:
+                        with os.scandir(path) as it:
+                            return any(e.name in PROJECT_MARKERS for e in it)
+                    except OSError:
+                        return False
+
+                with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+                    for (dir_name, d), is_project in zip(subdirs, pool.map(_has_marker, (p for _, p in subdirs))):
+                        if is_project:
+                            found_items[dir_name] = d
                 
-            # 保存到文件
-            import yaml
-            with open(self.agent.user_profile_path, 'w', encoding='utf-8') as f:
-                yaml.dump(self.agent.user_data, f, allow_unicode=True)
-            
-            # 刷新 Agent 内存
-            self.agent.load_all_configs()
-            self.agent._init_client() # 刷新 System Prompt
+                # 更新 Agent 的 user_data (System Prompt 直接读取内存中的 user_data，立即生效)
+                with self._profile_lock:
+                    if 'known_projects' not in self.agent.user_data:
+                        self.agent.user_data['known_projects'] = {}
+
+                    known_projects = self.agent.user_data['known_projects']
+                    # [新增] 重复扫描同一目录且结果未变时，不再安排落盘
+                    if any(known_projects.get(k) != v for k, v in found_items.items()):
+                        known_projects.update(found_items)
+                        self._profile_dirty = True
+                        self.agent.invalidate_prompt_cache()
+                        # [修改点] 延迟合并落盘，不再每次写入都同步保存 + 重新加载配置
+                        self._schedule_profile_flush()
             
             return f"Scan complete. Remembered {len(found_items)} projects/notes in '{target_path}'. Memory updated."
             
@@ -713,17 +1298,19 @@ class Toolbox:
     def remember_user_fact(self, key, value):
         """记录事实"""
         try:
-            if 'user_info' not in self.agent.user_data:
-                self.agent.user_data['user_info'] = {}
-            
-            self.agent.user_data['user_info'][key] = value
-            
-            import yaml
-            with open(self.agent.user_profile_path, 'w', encoding='utf-8') as f:
-                yaml.dump(self.agent.user_data, f, allow_unicode=True)
-                
-            self.agent.load_all_configs()
-            self.agent._init_client()
+            with self._profile_lock:
+                if 'user_info' not in self.agent.user_data:
+                    self.agent.user_data['user_info'] = {}
+
+                # [新增] 事实未变化时不重写画像文件，也不重建客户端
+                if self.agent.user_data['user_info'].get(key) == value:
+                    return f"Memory unchanged: {key} = {value}"
+
+                self.agent.user_data['user_info'][key] = value
+                self._profile_dirty = True
+                self.agent.invalidate_prompt_cache()
+                # [修改点] 内存立即生效，落盘延迟合并 (连续记录多条事实只保存一次)
+                self._schedule_profile_flush()
             return f"Memory updated: {key} = {value}"
         except Exception as e:
             return f"Error saving fact: {e}"
@@ -731,7 +1318,19 @@ class Toolbox:
     # [新增] 联网能力实现方法
 
     def run_browse_url(self, url):
-        data = self.web_engine.fetch_page(url)
+        return self._format_page(self.web_engine.fetch_page(url))
+
+    def run_browse_urls(self, urls):
+        """[新增] 并发访问多个网页，按传入顺序拼接各页结果"""
+        if isinstance(urls, str):
+            urls = [urls]
+        if not urls:
+            return "Error: No URLs provided."
+        pages = self.web_engine.fetch_many(urls)
+        return "\n\n---\n\n".join(self._format_page(data) for data in pages)
+
+    @staticmethod
+    def _format_page(data):
         if "error" in data:
             return f"Error browsing page: {data['error']}"
         
@@ -739,18 +1338,10 @@ class Toolbox:
 
     def sentinel_proxy(self, func_name, kwargs):
         """哨兵系统代理"""
-        engine = self.agent.sentinel_engine
-        if func_name == "add_time_sentinel":
-            return engine.add_time_sentinel(kwargs['interval'], kwargs['unit'], kwargs['description'])
-        elif func_name == "add_file_sentinel":
-            return engine.add_file_sentinel(kwargs['path'], kwargs['description'])
-        elif func_name == "add_behavior_sentinel":
-            return engine.add_behavior_sentinel(kwargs['key_combo'], kwargs['description'])
-        elif func_name == "list_active_sentinels":
-            return json.dumps(engine.list_sentinels(), indent=2)
-        elif func_name == "remove_sentinel":
-            return str(engine.remove_sentinel(kwargs['type'], kwargs['id']))
-        return "Unknown sentinel command"
+        handler = self._sentinel_dispatch.get(func_name)
+        if handler is None:
+            return "Unknown sentinel command"
+        return handler(kwargs)
     
     # 增加直接访问方法供 router 调用
     def add_time_sentinel(self, interval, unit, description):
@@ -0,0 +1,191 @@
+# core/functools/trigram_index.py
+# [新增文件] 基于 SQLite 的持久化三元组 (trigram) 索引，为关键词搜索提供候选文件预筛选
+import os
+import sqlite3
+import hashlib
+import logging
+import time
+
+logger = logging.getLogger("TrigramIndex")
+
+# 单个目录最多索引的文件数 (防止误对整盘建索引)
+TRIGRAM_MAX_FILES = 20000
+# 超过该大小的文件不建立倒排，搜索时总是作为候选交给逐行校验
+TRIGRAM_MAX_FILE_BYTES = 1024 * 1024
+# [新增] 单次 refresh 的工作量上限 (耗时 / 读取字节数)。首次对大目录建索引会分摊到多次搜索中逐步完成，
+# 索引未完整之前 refresh 报告 complete=False，调用方应回退到有上限的逐文件扫描
+TRIGRAM_REFRESH_SECONDS = 2.0
+TRIGRAM_REFRESH_BYTES = 32 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    indexed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trigrams (
+    tri TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (tri, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_trigrams_file ON trigrams(file_id);
+"""
+
+
+def extract_trigrams(text):
+    """提取小写文本中的全部三元组 (去重)"""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def index_path_for(cache_dir, directory_path):
+    """每个被搜索目录对应一个独立的 .db 文件，以目录绝对路径的摘要命名"""
+    key = hashlib.md5(os.path.abspath(directory_path).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f"{key}.db")
+
+
+class TrigramIndex:
+    """
+    目录级 trigram 倒排索引。
+    - refresh(): 遍历目录，按 (mtime_ns, size) 增量更新新增/修改/删除的文件 (单次工作量有上限)
+    - candidates(): 对关键词的全部三元组求交集，返回可能包含关键词的文件
+    索引只做预筛选，调用方仍需逐文件校验真实命中。
+    """
+
+    def __init__(self, directory_path, db_path, ignore_dirs=(), text_exts=()):
+        self.directory_path = directory_path
+        self.ignore_dirs = set(ignore_dirs)
+        self.text_exts = set(text_exts)
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _walk_files(self, stop_event=None, deadline=None):
+        """
+        遍历目录下的文本文件，返回 ({path: (mtime_ns, size)}, 是否遍历完整)；被中断时返回 None。
+        超过 deadline 时提前返回已收集的部分 (不完整)。
+        """
+        current = {}
+        for root, dirs, files in os.walk(self.directory_path):
+            if stop_event and stop_event.is_set():
+                return None
+            if deadline is not None and time.monotonic() > deadline:
+                return current, False
+            dirs[:] = [d for d in dirs if d not in self.ignore_dirs]
+            for file in files:
+                if os.path.splitext(file)[1].lower() not in self.text_exts:
+                    continue
+                full_path = os.path.join(root, file)
+                try:
+                    st = os.stat(full_path)
+                except OSError:
+                    continue
+                current[full_path] = (st.st_mtime_ns, st.st_size)
+                if len(current) >= TRIGRAM_MAX_FILES:
+                    return current, True
+        return current, True
+
+    def refresh(self, stop_event=None, time_budget=TRIGRAM_REFRESH_SECONDS, byte_budget=TRIGRAM_REFRESH_BYTES):
+        """
+        增量刷新索引，返回 (新增/更新文件数, 删除文件数, 索引是否已完整)；被中断时返回 None (已提交的部分保留)。
+        [修改点] 耗时超过 time_budget 或读取超过 byte_budget 字节时提交已完成的部分并返回 complete=False，
+        下次调用从未索引 / 已变化的文件继续
+        """
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        walked = self._walk_files(stop_event, deadline)
+        if walked is None:
+            return None
+        current, walk_complete = walked
+        if not walk_complete:
+            # 目录未遍历完，无法判断哪些文件已被删除，本次不做任何修改
+            return 0, 0, False
+
+        known = {
+            path: (file_id, mtime_ns, size)
+            for file_id, path, mtime_ns, size in self.conn.execute("SELECT id, path, mtime_ns, size FROM files")
+        }
+
+        cur = self.conn.cursor()
+        removed = [known[p][0] for p in known.keys() - current.keys()]
+        for file_id in removed:
+            cur.execute("DELETE FROM trigrams WHERE file_id = ?", (file_id,))
+            cur.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+        updated = 0
+        bytes_read = 0
+        for path, (mtime_ns, size) in current.items():
+            old = known.get(path)
+            if old and old[1] == mtime_ns and old[2] == size:
+                continue
+            if stop_event and stop_event.is_set():
+                self.conn.commit()
+                return None
+            if (deadline is not None and time.monotonic() > deadline) or \
+                    (byte_budget is not None and bytes_read >= byte_budget):
+                self.conn.commit()
+                return updated, len(removed), False
+
+            tris = None
+            if size <= TRIGRAM_MAX_FILE_BYTES:
+                try:
+                    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                        tris = extract_trigrams(f.read())
+                except OSError:
+                    continue
+                bytes_read += size
+
+            if old:
+                file_id = old[0]
+                cur.execute("DELETE FROM trigrams WHERE file_id = ?", (file_id,))
+                cur.execute(
+                    "UPDATE files SET mtime_ns = ?, size = ?, indexed = ? WHERE id = ?",
+                    (mtime_ns, size, int(tris is not None), file_id)
+                )
+            else:
+                cur.execute(
+                    "INSERT INTO files (path, mtime_ns, size, indexed) VALUES (?, ?, ?, ?)",
+                    (path, mtime_ns, size, int(tris is not None))
+                )
+                file_id = cur.lastrowid
+
+            if tris:
+                cur.executemany("INSERT INTO trigrams (tri, file_id) VALUES (?, ?)", ((t, file_id) for t in tris))
+            updated += 1
+
+        self.conn.commit()
+        return updated, len(removed), True
+
+    def candidates(self, keyword):
+        """
+        返回可能包含 keyword 的文件路径列表 (按路径排序)。
+        关键词不足 3 个字符时索引无法筛选，返回 None 交由调用方全量扫描。
+        """
+        tris = extract_trigrams(keyword)
+        if not tris:
+            return None
+
+        placeholders = ",".join("?" * len(tris))
+        rows = self.conn.execute(
+            f"""
+            SELECT f.path FROM files f
+            WHERE f.indexed = 0
+               OR f.id IN (
+                   SELECT file_id FROM trigrams WHERE tri IN ({placeholders})
+                   GROUP BY file_id HAVING COUNT(*) = ?
+               )
+            ORDER BY f.path
+            """,
+            (*tris, len(tris))
+        )
+        return [r[0] for r in rows]
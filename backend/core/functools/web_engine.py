@@ -1,9 +1,144 @@
 # core/functools/web_engine.py
 import requests
-from bs4 import BeautifulSoup
-from duckduckgo_search import DDGS
 import logging
 import re
+import functools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+from urllib3.util.retry import Retry
+
+# [新增] 正文提取前整体剔除的无关元素 (连同其子树)
+STRIP_TAGS = ("script", "style", "nav", "footer", "header", "iframe", "noscript")
+# 正文候选块的标签 (CSS 选择器形式供 selectolax 使用)
+CONTENT_CSS = "p,h1,h2,h3,ul,ol,div"
+# 正文块中即使很短也保留的标题标签
+HEADING_TAGS = frozenset({"h1", "h2", "h3"})
+# 非标题块保留所需的最少字符数 (更短的通常是菜单项)
+MIN_BLOCK_CHARS = 20
+# [新增] 连接池规模 (不小于并发抓取数) 与连接失败 / 网关错误时的自动重试
+HTTP_POOL_CONNECTIONS = 16
+HTTP_POOL_MAXSIZE = 32
+HTTP_RETRIES = 2
+HTTP_RETRY_BACKOFF = 0.3
+# [新增] 网页 / 搜索结果缓存：同一会话内反复访问同一 URL 或查询时免去下载与解析
+WEB_CACHE_SIZE = 128
+WEB_CACHE_TTL = 600
+# [新增] fetch_many 的默认并发数 (不超过连接池上限)
+FETCH_MANY_WORKERS = 8
+# [新增] 单个网页最多下载的字节数 (超出部分不再接收，直接断开连接)，及正文提取的字符上限
+PAGE_MAX_BYTES = 2 * 1024 * 1024
+PAGE_MAX_CHARS = 8000
+# 响应未声明编码时，用于探测编码的样本大小
+ENCODING_SNIFF_BYTES = 64 * 1024
+
+
+class _TTLCache:
+    """[新增] 带过期时间的 LRU 缓存 (线程安全，供并发抓取共用)"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            if time.monotonic() - hit[0] >= self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+@functools.lru_cache(maxsize=None)
+def _content_xpath():
+    """
+    [新增] 正文候选块的预编译 XPath (首次联网时才导入 lxml 并编译，之后复用)
+    [修改点] 长度预过滤在 libxml2 内完成：子树原始文本不足 MIN_BLOCK_CHARS 的非标题块
+    (去空白后只会更短，必然被丢弃) 不再生成 Python 对象，也不再逐节点拼接文本
+    """
+    from lxml import etree
+    return etree.XPath(
+        "descendant::*[self::h1 or self::h2 or self::h3"
+        f" or ((self::p or self::ul or self::ol or self::div) and string-length(.) > {MIN_BLOCK_CHARS})]"
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _selectolax_parser():
+    """[新增] 可选依赖 selectolax (Lexbor 后端)：已安装时返回解析器类，否则返回 None (回退到 lxml)"""
+    try:
+        from selectolax.lexbor import LexborHTMLParser
+    except ImportError:
+        return None
+    return LexborHTMLParser
+
+
+def _extract_with_selectolax(parser_cls, text):
+    """
+    [新增] 用 selectolax 解析，返回 (标题, 惰性产出 (标签名, 块文本) 的迭代器)。
+    Lexbor 是纯 C 的 HTML5 解析器，解析与选择器匹配都比 lxml 更快。
+    """
+    tree = parser_cls(text)
+    for node in tree.css(",".join(STRIP_TAGS)):
+        node.decompose()
+
+    title_node = tree.css_first('title')
+    title = title_node.text() if title_node is not None else None
+
+    # 优先获取 article 标签
+    target = tree.css_first('article') or tree.body
+    if target is None:
+        return title, iter(())
+    # text(strip=True) 等价于 get_text(strip=True)：各段文本去除首尾空白后直接拼接 (注释不计入)
+    return title, ((node.tag, node.text(deep=True, separator='', strip=True)) for node in target.css(CONTENT_CSS))
+
+
+def _extract_with_lxml(text, raw):
+    """
+    用 lxml 解析 + 预编译 XPath 提取，遍历全部在 libxml2 的 C 代码中完成。
+    返回 (标题, 惰性产出 (标签名, 块文本) 的迭代器)。
+    """
+    import lxml.html
+    from lxml import etree
+
+    try:
+        try:
+            doc = lxml.html.document_fromstring(text)
+        except ValueError:
+            # 带 XML 编码声明的页面 (XHTML) 不接受 str 输入，改交原始字节由 lxml 自行识别编码
+            doc = lxml.html.document_fromstring(raw)
+    except etree.ParserError:
+        # 空文档
+        return None, iter(())
+
+    # 移除无关元素 (单次 C 调用；保留元素之后的尾随文本)
+    etree.strip_elements(doc, *STRIP_TAGS, etree.Comment, with_tail=False)
+    title = doc.findtext('.//title')
+
+    # 优先获取 article 标签
+    target = doc.find('.//article')
+    if target is None:
+        target = doc.find('body')
+    if target is None:
+        return title, iter(())
+    # 等价于 get_text(strip=True)：各段文本去除首尾空白后直接拼接
+    return title, ((el.tag, "".join(t.strip() for t in el.itertext())) for el in _content_xpath()(target))
+
 
 class WebEngine:
     """
@@ -15,14 +150,40 @@ class WebEngine:
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
         }
+        # [新增] 复用同一个 Session：keep-alive 连接池让同一站点的后续请求省去 TCP + TLS 握手
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        retry = Retry(
+            total=HTTP_RETRIES,
+            backoff_factor=HTTP_RETRY_BACKOFF,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # [新增] 只缓存成功的结果，失败的请求下次仍会重试
+        self._page_cache = _TTLCache(WEB_CACHE_SIZE, WEB_CACHE_TTL)
+        self._search_cache = _TTLCache(WEB_CACHE_SIZE, WEB_CACHE_TTL)
+
+    def close(self):
+        """[新增] 关闭连接池 (服务关闭时调用)"""
+        self.session.close()
 
     def search(self, query, max_results=5):
         """
         使用 DuckDuckGo 进行搜索，无需 API Key。
         返回结果列表: [{'title':..., 'href':..., 'body':...}]
         """
+        cache_key = (query, max_results)
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
         results = []
         try:
+            # [修改点] 搜索/解析库较重，仅在真正联网时才导入，缩短后端启动时间
+            from duckduckgo_search import DDGS
             with DDGS() as ddgs:
                 # 使用 text 搜索
                 ddgs_gen = ddgs.text(query, max_results=max_results)
@@ -32,6 +193,7 @@ class WebEngine:
                         "url": r.get('href'),
                         "snippet": r.get('body')
                     })
+            self._search_cache.put(cache_key, tuple(results))
             return results
         except Exception as e:
             return [{"error": f"Search failed: {str(e)}"}]
@@ -39,49 +201,85 @@ class WebEngine:
     def fetch_page(self, url):
         """
         获取网页内容并提取正文（去除广告、导航栏、脚本）。
+        [修改点] TTL 时间内重复访问同一 URL 直接返回缓存的提取结果
         """
+        cached = self._page_cache.get(url)
+        if cached is not None:
+            return dict(cached)
+
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
+            # [修改点] 流式下载，累计到 PAGE_MAX_BYTES 即停止接收并关闭连接，超大页面不再整体读入内存
+            response = self.session.get(url, timeout=10, stream=True)
+            try:
+                response.raise_for_status()
+                chunks = []
+                size = 0
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= PAGE_MAX_BYTES:
+                        break
+                raw = b"".join(chunks)[:PAGE_MAX_BYTES]
+            finally:
+                response.close()
             
-            # 自动处理编码
-            if response.encoding == 'ISO-8859-1':
-                response.encoding = response.apparent_encoding
-                
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            # 1. 移除无关元素
-            for script in soup(["script", "style", "nav", "footer", "header", "iframe", "noscript"]):
-                script.decompose()
+            # 自动处理编码 (未声明或回退为 ISO-8859-1 时按内容探测，与 apparent_encoding 相同的探测库)
+            encoding = response.encoding
+            if not encoding or encoding == 'ISO-8859-1':
+                encoding = chardet.detect(raw[:ENCODING_SNIFF_BYTES]).get('encoding') or 'utf-8'
+            try:
+                text = raw.decode(encoding, errors='replace')
+            except LookupError:
+                text = raw.decode('utf-8', errors='replace')
 
-            # 2. 提取标题
-            title = soup.title.string if soup.title else "No Title"
+            # [修改点] 解析与提取：优先 selectolax (Lexbor)，未安装时使用 lxml + XPath；
+            # 两者都不再经过 BeautifulSoup 逐节点的 Python 包装
+            parser_cls = _selectolax_parser()
+            if parser_cls is not None:
+                title, blocks = _extract_with_selectolax(parser_cls, text)
+            else:
+                title, blocks = _extract_with_lxml(text, raw)
+            title = title or "No Title"
             
-            # 3. 提取正文 (简单算法：提取 p, h1-h6, li)
-            # 也可以使用 readability-lxml 库，这里手写一个轻量级的
+            # 提取正文 (简单算法：提取 p, h1-h3, 列表与 div 块)
+            # [修改点] 累计长度超过上限后立即停止提取，剩余节点不再遍历
             text_blocks = []
-            
-            # 优先获取 article 标签
-            article = soup.find('article')
-            target_dom = article if article else soup.body
-            
-            if target_dom:
-                for element in target_dom.find_all(['p', 'h1', 'h2', 'h3', 'ul', 'ol', 'div']):
-                    text = element.get_text(strip=True)
-                    # 过滤过短的文本（通常是菜单项）
-                    if len(text) > 20 or element.name in ['h1', 'h2', 'h3']:
-                        text_blocks.append(text)
+            truncated = False
+            total = 0
+            for tag, block in blocks:
+                # 过滤过短的文本（通常是菜单项）
+                if len(block) > MIN_BLOCK_CHARS or tag in HEADING_TAGS:
+                    text_blocks.append(block)
+                    total += len(block) + 2
+                    if total > PAGE_MAX_CHARS:
+                        truncated = True
+                        break
             
             # 合并文本，限制长度防止 Context 溢出
             full_text = "\n\n".join(text_blocks)
-            if len(full_text) > 8000:
-                full_text = full_text[:8000] + "\n...[Content Truncated]"
+            if truncated or len(full_text) > PAGE_MAX_CHARS:
+                full_text = full_text[:PAGE_MAX_CHARS] + "\n...[Content Truncated]"
                 
-            return {
+            page = {
                 "title": title,
                 "url": url,
                 "content": full_text if full_text else "No textual content found."
             }
+            # 服务端声明不可缓存 (Cache-Control: no-store) 时不写入缓存
+            if 'no-store' not in response.headers.get('Cache-Control', '').lower():
+                self._page_cache.put(url, page)
+            return dict(page)
             
         except Exception as e:
-            return {"error": f"Failed to fetch page: {str(e)}"}
\ No newline at end of file
+            return {"error": f"Failed to fetch page: {str(e)}"}
+
+    def fetch_many(self, urls, max_workers=FETCH_MANY_WORKERS):
+        """
+        [新增] 并发抓取多个网页，返回与 urls 顺序一致的结果列表 (每项同 fetch_page)。
+        各线程共用 Session 的连接池，网络等待期间释放 GIL，耗时约等于最慢的一个页面。
+        """
+        urls = list(urls)
+        if len(urls) <= 1:
+            return [self.fetch_page(u) for u in urls]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(urls), HTTP_POOL_MAXSIZE)) as pool:
+            return list(pool.map(self.fetch_page, urls))
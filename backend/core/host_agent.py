@@ -1,11 +1,12 @@
 # core/host_agent.py
-import yaml
+import copy
 import json
 import os
 import time
 import threading
 import traceback
 import re
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 from core.memory import ConversationMemory
 # [修改点] 导入解耦后的工具箱
@@ -14,6 +15,72 @@ from core.rag_store import RAGStore
 # [修改点] 导入 SentinelEngine
 from core.sentinel_engine import SentinelEngine
 from core.skill_manager import SkillManager  # [新增]
+# [修改点] YAML 读写统一走 C 加速的 Loader/Dumper
+from utils import fast_yaml
+
+# [新增] 可选依赖 orjson：工具调用参数解析在 ReAct 循环中每步都会执行，
+# orjson (Rust 实现) 解析小 JSON 比标准库快数倍；未安装时回退到 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# [新增] 同一轮中出现多次时可并发预取的网页抓取类工具，及并发上限
+PARALLEL_FETCH_TOOLS = frozenset({"browse_url"})
+PARALLEL_FETCH_WORKERS = 5
+
+
+def _parse_tool_arguments(raw):
+    """[新增] 解析模型给出的工具参数 JSON 字符串，格式错误或为空时返回 {}"""
+    try:
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
+    except (ValueError, TypeError):
+        # orjson.JSONDecodeError 与 json.JSONDecodeError 都是 ValueError 的子类
+        return {}
+
+
+# [新增] 基础身份设定是纯静态文本，提升为模块级常量，
+# 每次构建 System Prompt 时不再重新创建这段长字符串。
+BASE_IDENTITY_PROMPT = """
+You are Resonance, an advanced Windows AI Host.
+
+### CORE OPERATING PROTOCOLS MUST FOLLOW:
+
+1.  **PLAN FIRST (MANDATORY)**: 
+    For ANY task that is not a simple greeting, you MUST start your response with a structured plan block using the `<plan>` XML tag.
+    
+    Format:
+    <plan>
+    - [ ] Step 1: Description
+    - [ ] Step 2: Description (Deliverable: filename.ext)
+    </plan>
+
+    *Update this plan in subsequent turns by marking items as [x].*
+
+2.  **DELIVERABLE AWARENESS**: 
+    Know exactly what files or results you need to produce. Do not stop until the final deliverable is created and verified.
+
+3.  **TOOL USAGE**:
+    - Use `list_directory_files` before reading/writing to understand the path.
+    - Use `read_file_content` to check content before editing.
+    - If a tool fails, analyze the error and try a different approach.
+
+5. **Active Memory.** You have access to a long-term Vector Memory. 
+   - You can query it using `search_long_term_memory` if the context is missing.
+   - You can SAVE important findings using `add_long_term_memory`.
+   - You can DELETE obsolete facts using `delete_long_term_memory`.
+
+6. **Anthropics Skills.**    
+    - To use a specialized capability, use 'manage_skills' to ACTIVATE it first.
+    - Once active, follow the SOP RIGIDLY.
+
+Tool Use Reminders:
+You have a limit on how many tools you can use in one session. Use them wisely.
+If you hit the limit, you will be given a chance to reflect and continue if necessary.
+Or, if user continue to chat with you, the limit will be reset too.
+"""
 
 class HostAgent:
     def __init__(self, default_session="resonance_main", config_path="config/config.yaml"):
@@ -34,6 +101,12 @@ class HostAgent:
         self.config_path = os.path.join(backend_root, config_path)
         self.profiles_path = os.path.join(backend_root, "config/profiles.yaml")
         self.user_profile_path = os.path.join(backend_root, "config/user_profile.yaml")
+
+        # [新增] 已解析的 YAML 配置缓存: path -> ((mtime_ns, size), data)
+        self._yaml_cache = {}
+        # [新增] 配置 / 画像的读写锁 (可重入)：所有落盘、重新加载以及对 user_data 的原地修改共用，
+        # 避免多个线程同时序列化 / 写入同一文件，或在序列化过程中修改字典
+        self.config_lock = threading.RLock()
         
         # 加载所有配置
         self.load_all_configs()
@@ -52,6 +125,9 @@ class HostAgent:
 
         self.stop_flag = False
         self.memory_cache = {}
+        # [新增] 保护 memory_cache 的创建过程：多个 WebSocket 线程同时访问新会话时，
+        # 避免重复创建 ConversationMemory 导致各自持有不同实例 (日志缓存互相覆盖)
+        self._memory_lock = threading.Lock()
         
         # 初始化向量数据库 (RAG)
         self.rag_store = RAGStore(persistence_path=vec_path)
@@ -85,41 +161,86 @@ class HostAgent:
     def get_memory(self, session_id=None) -> ConversationMemory:
         """[新增] 获取指定会话的内存对象，如果不存在则创建并缓存"""
         sid = session_id or self.active_session_id
-        if sid not in self.memory_cache:
-            win_size = self.config.get('system', {}).get('memory', {}).get('window_size', 15) # [修改] 增加默认窗口大小
-            self.memory_cache[sid] = ConversationMemory(session_id=sid, window_size=win_size)
-        return self.memory_cache[sid]
+        # 快速路径：已缓存时无需加锁
+        mem = self.memory_cache.get(sid)
+        if mem is not None:
+            return mem
+        with self._memory_lock:
+            mem = self.memory_cache.get(sid)
+            if mem is None:
+                win_size = self.config.get('system', {}).get('memory', {}).get('window_size', 15) # [修改] 增加默认窗口大小
+                mem = ConversationMemory(session_id=sid, window_size=win_size)
+                self.memory_cache[sid] = mem
+        return mem
 
     @property
     def memory(self):
         return self.get_memory(self.active_session_id)
 
+    def _load_yaml_cached(self, path):
+        """
+        [新增] 读取 YAML 配置；文件的修改时间和大小与上次读取时一致则直接复用已解析的结果。
+        文件不存在时返回 None。
+        [修改点] 缓存只保存磁盘内容的原始解析结果，对外总是返回深拷贝：调用方会原地修改
+        config / profiles / user_data，未保存的修改不能污染缓存 (深拷贝仍远比重新解析便宜)
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self._yaml_cache.pop(path, None)
+            return None
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._yaml_cache.get(path)
+        if cached is not None and cached[0] == key:
+            return copy.deepcopy(cached[1])
+        # [修改点] 通过 JSON 快照加速读取 (YAML 修改后自动失效)
+        data = fast_yaml.load_file(path)
+        self._yaml_cache[path] = (key, data)
+        return copy.deepcopy(data)
+
     def load_all_configs(self):
-        """加载系统配置、模型配置和用户画像"""
-        # 1. 加载主配置
-        if os.path.exists(self.config_path):
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                self.config = yaml.safe_load(f)
-        else:
-            print(f"[Critical Warning] Config not found at {self.config_path}")
-            self.config = {}
+        """
+        加载系统配置、模型配置和用户画像
+        [修改点] 磁盘上未变化的文件复用上次解析的结果，只重新读取实际被修改的文件
+        """
+        with self.config_lock:
+            # [新增] 先落盘工具箱中尚未保存的画像修改，否则重新加载会用磁盘上的旧画像覆盖它们
+            if getattr(self, 'toolbox', None) is not None:
+                self.toolbox.flush_profile()
+
+            # 1. 加载主配置
+            config = self._load_yaml_cached(self.config_path)
+            if config is not None:
+                self.config = config
+            else:
+                print(f"[Critical Warning] Config not found at {self.config_path}")
+                self.config = {}
             
-        # [修改点] 刷新 debug 状态
-        self.debug_mode = self.config.get('system', {}).get('debug', False)
+            # [修改点] 刷新 debug 状态
+            self.debug_mode = self.config.get('system', {}).get('debug', False)
 
-        # 2. 加载模型 Profiles
-        if os.path.exists(self.profiles_path):
-            with open(self.profiles_path, 'r', encoding='utf-8') as f:
-                self.profiles = yaml.safe_load(f).get('profiles', {})
-        else:
-            self.profiles = {}
+            # 2. 加载模型 Profiles
+            profiles = self._load_yaml_cached(self.profiles_path)
+            self.profiles = profiles.get('profiles', {}) if profiles is not None else {}
             
-        # 3. 加载用户画像
-        if os.path.exists(self.user_profile_path):
-            with open(self.user_profile_path, 'r', encoding='utf-8') as f:
-                self.user_data = yaml.safe_load(f)
-        else:
-            self.user_data = {}
+            # 3. 加载用户画像
+            user_data = self._load_yaml_cached(self.user_profile_path)
+            self.user_data = user_data if user_data is not None else {}
+
+            # [新增] 记录磁盘上配置的内容摘要，update_config 据此跳过无变化的保存
+            self._saved_digests = {
+                self.config_path: fast_yaml.digest(self.config),
+                self.profiles_path: fast_yaml.digest({'profiles': self.profiles}),
+            }
+            if user_data is not None:
+                self._saved_digests[self.user_profile_path] = fast_yaml.digest(self.user_data)
+
+            # [新增] 配置 / 画像已重新加载，丢弃缓存的 Prompt 片段
+            self._prompt_cache = {}
+
+            # [新增] 配置已重新加载，丢弃工具箱中依赖配置的工具定义缓存 (首次加载时工具箱尚未创建)
+            if getattr(self, 'toolbox', None) is not None:
+                self.toolbox.invalidate_tool_cache()
 
     def _init_client(self):
         """根据 active_profile 初始化 LLM 客户端"""
@@ -140,6 +261,12 @@ class HostAgent:
         self.base_url = self.current_model_config.get('base_url')
         self.api_key = self.current_model_config.get('api_key')
 
+        # [新增] 连接参数未变化时复用现有客户端 (保留其连接池)，
+        # 避免每次保存配置 / 记住用户事实时都重建 HTTP 连接
+        client_key = (self.base_url, self.api_key)
+        if self.client is not None and getattr(self, '_client_key', None) == client_key:
+            return
+
         # 初始化 OpenAI 客户端
         try:
             self.client = OpenAI(
@@ -148,11 +275,14 @@ class HostAgent:
                 timeout=60.0,  # 设置超时防止无限等待
                 max_retries=2
             )
+            self._client_key = client_key
             print(f"[LLM Init]: Client configured. URL: {self.base_url}, Model: {self.current_model_config.get('model')}")
         except Exception as e:
             print(f"[LLM Error]: Failed to initialize OpenAI client: {e}")
             # 即使失败，也定义为 None，防止 AttributeError，并在 chat 中处理
             self.client = None
+            self._client_key = None
+
     def activate_skill(self, skill_name):
         """
         [State Change] 激活一个技能 (Activation Phase)。
@@ -181,45 +311,8 @@ class HostAgent:
         构建高级结构化 Prompt
         包含：身份、工具能力、用户画像、长期记忆(RAG)、当前对话摘要
         """
-        # 1. 基础身份设定
-        base_identity = """
-You are Resonance, an advanced Windows AI Host.
-
-### CORE OPERATING PROTOCOLS MUST FOLLOW:
-
-1.  **PLAN FIRST (MANDATORY)**: 
-    For ANY task that is not a simple greeting, you MUST start your response with a structured plan block using the `<plan>` XML tag.
-    
-    Format:
-    <plan>
-    - [ ] Step 1: Description
-    - [ ] Step 2: Description (Deliverable: filename.ext)
-    </plan>
-
-    *Update this plan in subsequent turns by marking items as [x].*
-
-2.  **DELIVERABLE AWARENESS**: 
-    Know exactly what files or results you need to produce. Do not stop until the final deliverable is created and verified.
-
-3.  **TOOL USAGE**:
-    - Use `list_directory_files` before reading/writing to understand the path.
-    - Use `read_file_content` to check content before editing.
-    - If a tool fails, analyze the error and try a different approach.
-
-5. **Active Memory.** You have access to a long-term Vector Memory. 
-   - You can query it using `search_long_term_memory` if the context is missing.
-   - You can SAVE important findings using `add_long_term_memory`.
-   - You can DELETE obsolete facts using `delete_long_term_memory`.
-
-6. **Anthropics Skills.**    
-    - To use a specialized capability, use 'manage_skills' to ACTIVATE it first.
-    - Once active, follow the SOP RIGIDLY.
-
-Tool Use Reminders:
-You have a limit on how many tools you can use in one session. Use them wisely.
-If you hit the limit, you will be given a chance to reflect and continue if necessary.
-Or, if user continue to chat with you, the limit will be reset too.
-"""
+        # 1. 基础身份设定 (模块级常量，避免每轮重复构造)
+        base_identity = BASE_IDENTITY_PROMPT
         messages = memory_instance.get_full_log()
         latest_plan = ""
         # 倒序查找最近的包含 <plan> 的 Assistant 消息
@@ -238,36 +331,20 @@ Or, if user continue to chat with you, the limit will be reset too.
             # 如果没有历史计划，但有新请求，提示建立计划
             plan_injection = f"\n\n### 🆕 NEW MISSION DETECTED\nUser Request: \"{original_query}\"\nACTION: Generate a <plan> immediately.\n"
         # 3. 注入用户画像
-        user_section = "\n### USER PROFILE\n"
-        user_info = self.user_data.get('user_info', {})
-        known_projects = self.user_data.get('known_projects', {})
-        
-        for k, v in user_info.items():
-            user_section += f"- {k}: {v}\n"
-        if known_projects:
-            user_section += "- Known Projects:\n"
-        for proj, path in known_projects.items():
-            user_section += f"  * {proj}: {path}\n"
+        # [修改点] 画像与技能片段只依赖配置 / 技能状态，缓存后在各轮之间复用
+        user_section = self._user_profile_section()
 
         # --- [关键修改] JIT SOP 注入 ---
-        skill_section = ""
-        if self.active_skill:
-            # 只有当 Skill 激活时，才加载 SOP (减少 Token，防止污染)
-            sop_text, _ = self.skill_manager.load_skill_context(self.active_skill)
-            if sop_text:
-                skill_section = f"\n\n### 🔥 ACTIVE SKILL: {self.active_skill}\n{sop_text}\nFOLLOW THIS SOP RIGIDLY.\n"
-        else:
-            # 未激活时，提示可用技能索引 (Discovery Phase)
-            skill_index = self.skill_manager.get_skill_index()
-            skill_section = f"\n### AVAILABLE SKILLS\n{skill_index}\n(Use 'manage_skills' to activate one if needed)\n"
+        skill_section = self._skill_section()
 
         # 4. 长期记忆注入 (RAG Results)
         rag_section = ""
         if relevant_memories:
-            rag_section = "\n### Long-term Memories (Reference Only)\n"
-            for mem in relevant_memories:
-                rag_section += f"- {mem}\n"
-            rag_section += "(Use these ONLY if they help the *Current* Original Intent.)\n"
+            # [修改点] 列表 + join 拼接
+            parts = ["\n### Long-term Memories (Reference Only)\n"]
+            parts.extend(f"- {mem}\n" for mem in relevant_memories)
+            parts.append("(Use these ONLY if they help the *Current* Original Intent.)\n")
+            rag_section = "".join(parts)
 
         # [修改点] 使用传入的 memory_instance
         summary_text = memory_instance.load_summary()
@@ -276,13 +353,62 @@ Or, if user continue to chat with you, the limit will be reset too.
             summary_section = f"\n### PREVIOUS CONVERSATION SUMMARY\n{summary_text}\n"
 
         # 组合 Prompt
-        full_prompt = base_identity + plan_injection + user_section + skill_section + rag_section + summary_section
+        full_prompt = "".join((base_identity, plan_injection, user_section, skill_section, rag_section, summary_section))
 
         # [修改点] 使用 debug_mode 属性判断是否打印
         if self.debug_mode:
             print(f"[DEBUG] Full Prompt:{full_prompt}")
         return full_prompt
 
+    def invalidate_prompt_cache(self):
+        """[新增] 用户画像在内存中被修改后调用，下次构建 Prompt 时重新生成画像片段"""
+        self._prompt_cache.pop('user', None)
+
+    def _user_profile_section(self):
+        """[新增] 用户画像片段；缓存至画像被修改或配置重新加载"""
+        cached = self._prompt_cache.get('user')
+        if cached is not None:
+            return cached
+
+        user_info = self.user_data.get('user_info', {})
+        known_projects = self.user_data.get('known_projects', {})
+        
+        # [修改点] 片段先收集到列表再一次 join，不再逐条 += 反复复制累积的字符串
+        parts = ["\n### USER PROFILE\n"]
+        parts.extend(f"- {k}: {v}\n" for k, v in user_info.items())
+        if known_projects:
+            parts.append("- Known Projects:\n")
+            parts.extend(f"  * {proj}: {path}\n" for proj, path in known_projects.items())
+        user_section = "".join(parts)
+
+        self._prompt_cache['user'] = user_section
+        return user_section
+
+    def _skill_section(self):
+        """
+        [新增] 技能片段：激活时为 SOP 全文，否则为技能索引。
+        按 (激活技能, 注册表版本) 缓存，免去每次构建 Prompt 都重新读取 SKILL.md
+        """
+        cache_key = (self.active_skill, getattr(self.skill_manager, 'registry_version', None))
+        cached = self._prompt_cache.get('skill')
+        if cached is not None and cached[0] == cache_key:
+            return cached[1]
+
+        skill_section = ""
+        if self.active_skill:
+            # 只有当 Skill 激活时，才加载 SOP (减少 Token，防止污染)
+            res = self.skill_manager.load_skill_context(self.active_skill)
+            sop_text = res[0] if res else ""
+            if sop_text:
+                skill_section = f"\n\n### 🔥 ACTIVE SKILL: {self.active_skill}\n{sop_text}\nFOLLOW THIS SOP RIGIDLY.\n"
+        else:
+            # 未激活时，提示可用技能索引 (Discovery Phase)
+            skill_index = self.skill_manager.get_skill_index()
+            skill_section = f"\n### AVAILABLE SKILLS\n{skill_index}\n(Use 'manage_skills' to activate one if needed)\n"
+
+        self._prompt_cache['skill'] = (cache_key, skill_section)
+        return skill_section
+
     def _update_summary_if_needed(self, memory_instance: ConversationMemory):
         """[摘要机制] 检查是否需要压缩历史记录"""
         if not self.config['system'].get('memory', {}).get('enable_summary', True):
@@ -625,8 +751,10 @@ Response (JSON Only):
                             if retry_count <= MAX_RETRIES:
                                 # 通知前端正在重试
                                 yield {"type": "status", "content": f"⚠️ API call failed, retrying in {backoff_time:.1f}s ({retry_count}/{MAX_RETRIES})..."}
-                                import time
-                                time.sleep(backoff_time)
+                                # [修改点] 用 stop_event.wait 代替 time.sleep：退避期间用户点击停止可立即返回
+                                if stop_event.wait(backoff_time):
+                                    yield {"type": "status", "content": "⛔ Task Interrupted."}
+                                    return
                             else:
                                 # 所有重试都失败
                                 logger.error(
@@ -728,16 +856,22 @@ Response (JSON Only):
                             for tc in active_tool_calls
                         ]})
                         
+                        # [修改点] 先统一解析参数，多个网页抓取调用提前并发执行，下面仍按原顺序逐个回填结果
+                        parsed_calls = []
                         for tc in active_tool_calls:
+                            parsed_calls.append((tc, _parse_tool_arguments(tc.function.arguments)))
+                        prefetched = self._prefetch_parallel_tools(parsed_calls, stop_event)
+
+                        for i, (tc, args) in enumerate(parsed_calls):
                             if stop_event.is_set(): return
                             func_name = tc.function.name
-                            try:
-                                args = json.loads(tc.function.arguments)
-                            except:
-                                args = {}
                             
                             yield {"type": "status", "content": f"Executing: {func_name}..."}
-                            tool_result_raw = self._route_tool_execution(func_name, args, stop_event)
+                            future = prefetched.get(i)
+                            if future is not None:
+                                tool_result_raw = future.result()
+                            else:
+                                tool_result_raw = self._route_tool_execution(func_name, args, stop_event)
                             
                             # 增加 Prompt 指引
                             tool_result = f"{tool_result_raw}\n\n[System: Check your plan. Update <plan> status in next response.]"
@@ -752,6 +886,11 @@ Response (JSON Only):
                         is_generation_finished = True
                         break # 跳出 Action Loop
 
+                # [新增] 督战检查本身是一次完整的 LLM 调用，已被打断时直接跳过
+                if stop_event.is_set():
+                    yield {"type": "status", "content": "⛔ Task Interrupted."}
+                    return
+
                 # 3. 督战检查 (Supervisor Check)
                 # 只有当 AI 认为自己完成了（跳出了 Action Loop），且还没达到 Supervisor 限制时检查
                 if is_generation_finished and supervisor_loops < MAX_SUPERVISOR_LOOPS:
@@ -799,6 +938,89 @@ Response (JSON Only):
                 # 任务结束后并不一定要删除 Event，可以留着复用，只要每次 chat start 时 clear 即可
                 pass
 
+    def _get_tool_routes(self):
+        """
+        [新增] 工具名 -> 处理函数 的分发表，首次调用时构建并缓存。
+        替代原来逐个比较工具名的 if/elif 长链，路由查找为 O(1)。
+        处理函数签名统一为 (args, stop_event)。
+        """
+        routes = getattr(self, '_tool_routes', None)
+        if routes is not None:
+            return routes
+
+        tb = self.toolbox
+        routes = {
+            # [新增] 路由 Active Memory Tools
+            "search_long_term_memory": lambda a, ev: tb.search_long_term_memory(a.get("query")),
+            "add_long_term_memory": lambda a, ev: tb.add_long_term_memory(a.get("text"), a.get("tag")),
+            "delete_long_term_memory": lambda a, ev: tb.delete_long_term_memory(a.get("memory_id")),
+
+            # Skills
+            "manage_skills": lambda a, ev: tb.manage_skills(a.get("action"), a.get("skill_name")),
+            "learn_new_skill": lambda a, ev: tb.learn_new_skill(a.get("url_or_path")),
+
+            # 遗留脚本
+            "invoke_legacy_script": lambda a, ev: tb.invoke_registered_skill(a.get("alias"), a.get("args", ""), ev),
+
+            "execute_shell_command": lambda a, ev: tb.execute_shell(a.get("command"), stop_event=ev),
+            # 这里只负责返回扫描结果字符串
+            "scan_directory_projects": lambda a, ev: tb.scan_and_remember(a.get("path")),
+            "read_file_content": lambda a, ev: tb.read_file_content(a.get("file_path")),
+            # 只负责更新 UserProfile 文件
+            "remember_user_fact": lambda a, ev: tb.remember_user_fact(a.get("key"), a.get("value")),
+            "list_directory_files": lambda a, ev: tb.list_directory_files(
+                directory_path=a.get("directory_path"),
+                recursive=a.get("recursive", True),
+                depth=a.get("depth", 2)
+            ),
+            # 搜索也可能耗时，传递 stop_event
+            "search_files_by_keyword": lambda a, ev: tb.search_files_by_keyword(
+                directory_path=a.get("directory_path"),
+                keyword=a.get("keyword"),
+                stop_event=ev
+            ),
+            "browse_url": lambda a, ev: tb.run_browse_url(a.get("url")),
+            "browse_urls": lambda a, ev: tb.run_browse_urls(a.get("urls") or []),
+
+            # [新增] 哨兵系统工具路由
+            "add_time_sentinel": lambda a, ev: tb.add_time_sentinel(
+                interval=a.get("interval"),
+                unit=a.get("unit"),
+                description=a.get("description")
+            ),
+            "add_file_sentinel": lambda a, ev: tb.add_file_sentinel(
+                path=a.get("path"),
+                description=a.get("description")
+            ),
+            "add_behavior_sentinel": lambda a, ev: tb.add_behavior_sentinel(
+                key_combo=a.get("key_combo"),
+                description=a.get("description")
+            ),
+            "list_active_sentinels": lambda a, ev: tb.list_sentinels(),
+            "remove_sentinel": lambda a, ev: tb.remove_sentinel(a.get("type"), a.get("id")),
+        }
+        self._tool_routes = routes
+        return routes
+
+    def _prefetch_parallel_tools(self, parsed_calls, stop_event=None):
+        """
+        [新增] 同一轮里有多个网页抓取调用时，提交到线程池并发执行，返回 {调用序号: Future}。
+        HTTP 等待相互重叠，N 次往返的耗时收敛为最慢的一次；只有一个时不预取，直接串行执行。
+        """
+        indices = [i for i, (tc, _) in enumerate(parsed_calls) if tc.function.name in PARALLEL_FETCH_TOOLS]
+        if len(indices) < 2:
+            return {}
+
+        pool = ThreadPoolExecutor(max_workers=min(PARALLEL_FETCH_WORKERS, len(indices)))
+        try:
+            return {
+                i: pool.submit(self._route_tool_execution, parsed_calls[i][0].function.name, parsed_calls[i][1], stop_event)
+                for i in indices
+            }
+        finally:
+            # 不等待：已提交的任务照常执行完毕，线程随后退出
+            pool.shutdown(wait=False)
+
     def _route_tool_execution(self, function_name, args, stop_event=None):
         """
         路由工具调用到 Toolbox
@@ -808,23 +1030,12 @@ Response (JSON Only):
             if stop_event and stop_event.is_set():
                 return "[System]: Tool execution cancelled."
 
-            # [新增] 路由 Active Memory Tools
-            if function_name == "search_long_term_memory":
-                return self.toolbox.search_long_term_memory(args.get("query"))
-            elif function_name == "add_long_term_memory":
-                return self.toolbox.add_long_term_memory(args.get("text"), args.get("tag"))
-            elif function_name == "delete_long_term_memory":
-                return self.toolbox.delete_long_term_memory(args.get("memory_id"))
-
-            # ... Existing Routes ...
-            if function_name == "manage_skills":
-                return self.toolbox.manage_skills(args.get("action"), args.get("skill_name"))
-            
-            # 2. Learn Skills
-            if function_name == "learn_new_skill":
-                return self.toolbox.learn_new_skill(args.get("url_or_path"))
+            # [修改点] 内置工具走分发表
+            handler = self._get_tool_routes().get(function_name)
+            if handler is not None:
+                return handler(args, stop_event)
 
-            # 2. 动态导入的技能 (skill_*)
+            # 动态导入的技能 (skill_*)
             if function_name.startswith("skill_"):
                 # 注意：skill_manager 可能在初始化时没准备好，增加防护
                 if self.skill_manager:
@@ -832,66 +1043,6 @@ Response (JSON Only):
                 else:
                     return "Error: Skill Manager not initialized."
 
-            # 3. 遗留脚本
-            if function_name == "invoke_legacy_script":
-                return self.toolbox.invoke_registered_skill(args.get("alias"), args.get("args", ""), stop_event)
-
-
-            elif function_name == "execute_shell_command":
-                return self.toolbox.execute_shell(args.get("command"), stop_event=stop_event)
-                
-
-            elif function_name == "scan_directory_projects":
-                # 这里只负责返回扫描结果字符串
-                return self.toolbox.scan_and_remember(args.get("path"))
-                
-            elif function_name == "read_file_content":
-                return self.toolbox.read_file_content(args.get("file_path"))
-                
-            elif function_name == "remember_user_fact":
-                # 只负责更新 UserProfile 文件
-                return self.toolbox.remember_user_fact(args.get("key"), args.get("value"))
-                
-            elif function_name == "list_directory_files":
-                return self.toolbox.list_directory_files(
-                    directory_path=args.get("directory_path"), 
-                    recursive=args.get("recursive", True),
-                    depth=args.get("depth", 2)
-                )
-                
-            elif function_name == "search_files_by_keyword":
-                # 搜索也可能耗时，传递 stop_event
-                return self.toolbox.search_files_by_keyword(
-                    directory_path=args.get("directory_path"), 
-                    keyword=args.get("keyword"),
-                    stop_event=stop_event
-                )
-
-            elif function_name == "browse_url":
-                return self.toolbox.run_browse_url(args.get("url"))
-
-            # [新增] 哨兵系统工具路由
-            elif function_name == "add_time_sentinel":
-                return self.toolbox.add_time_sentinel(
-                    interval=args.get("interval"),
-                    unit=args.get("unit"),
-                    description=args.get("description")
-                )
-            elif function_name == "add_file_sentinel":
-                return self.toolbox.add_file_sentinel(
-                    path=args.get("path"),
-                    description=args.get("description")
-                )
-            elif function_name == "add_behavior_sentinel":
-                return self.toolbox.add_behavior_sentinel(
-                    key_combo=args.get("key_combo"),
-                    description=args.get("description")
-                )
-            elif function_name == "list_active_sentinels":
-                return self.toolbox.list_sentinels()
-            elif function_name == "remove_sentinel":
-                return self.toolbox.remove_sentinel(args.get("type"), args.get("id"))
-
             skill_result = self.toolbox.route_skill_tool(function_name, args)
             if skill_result is not None:
                 return skill_result
@@ -903,22 +1054,46 @@ Response (JSON Only):
     def clear_memory(self):
         self.memory.clear()
     
+    def _dump_if_changed(self, data, path, force=False):
+        """
+        [新增] 内容摘要与上次落盘一致时跳过 YAML 序列化和磁盘写入，返回是否实际写入。
+        force=True 时总是写入 (调用方自行跟踪了未保存的修改)。
+        """
+        with self.config_lock:
+            new_digest = fast_yaml.digest(data)
+            if not force and self._saved_digests.get(path) == new_digest:
+                return False
+            fast_yaml.dump_file(data, path, allow_unicode=True, default_flow_style=False)
+            self._saved_digests[path] = new_digest
+            # [新增] 只让实际写入的文件的解析缓存失效，其余配置在下次 load_all_configs 时直接复用
+            self._yaml_cache.pop(path, None)
+            return True
+
+    def save_user_profile(self, force=False):
+        """
+        [新增] 持久化用户画像；内容与磁盘一致时直接跳过写入 (force=True 时总是写入)，返回是否实际写入。
+        [修改点] 内存中的 user_data 就是刚写入的内容，不再整体 load_all_configs 重新解析三份 YAML
+        """
+        return self._dump_if_changed(self.user_data, self.user_profile_path, force=force)
+
     def update_config(self, new_config=None, new_profiles=None, new_active_profile=None):
         """运行时更新配置"""
-        if new_config:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(new_config, f, allow_unicode=True, default_flow_style=False)
+        with self.config_lock:
+            changed = False
+            if new_config:
+                changed |= self._dump_if_changed(new_config, self.config_path)
         
-        if new_profiles:
-            with open(self.profiles_path, 'w', encoding='utf-8') as f:
-                yaml.dump({'profiles': new_profiles}, f, allow_unicode=True, default_flow_style=False)
+            if new_profiles:
+                changed |= self._dump_if_changed({'profiles': new_profiles}, self.profiles_path)
                 
-        if new_active_profile:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                current = yaml.safe_load(f)
-            current['active_profile'] = new_active_profile
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(current, f, allow_unicode=True, default_flow_style=False)
+            if new_active_profile:
+                current = fast_yaml.load_file(self.config_path)
+                current['active_profile'] = new_active_profile
+                changed |= self._dump_if_changed(current, self.config_path)
 
-        self.load_all_configs()
-        self._init_client()
\ No newline at end of file
+            # [修改点] 没有任何实际变化 (例如未编辑直接点保存)，无需重新加载配置
+            if not changed:
+                return
+
+            self.load_all_configs()
+            self._init_client()
@@ -6,6 +6,20 @@ import time
 import copy
 from typing import List, Dict, Any
 
+# [新增] 会话列表缓存：前端每次刷新侧边栏都会调用 list_sessions，
+# 每次都要 glob + 读取全部会话 JSON。这里按 base_dir 做短 TTL 缓存，
+# 写入 / 重命名 / 删除会话时主动失效，保证新会话立即可见。
+SESSIONS_CACHE_TTL = 5
+_sessions_cache = {}  # base_dir -> (cached_at, sessions)
+_session_meta_cache = {}  # file_path -> (mtime_ns, size, entry)
+
+def invalidate_sessions_cache(base_dir=None):
+    """清除会话列表缓存 (base_dir 为 None 时全部清除)"""
+    if base_dir is None:
+        _sessions_cache.clear()
+    else:
+        _sessions_cache.pop(os.path.normpath(base_dir), None)
+
 class ConversationMemory:
     """
     管理Agent的对话历史。
@@ -25,6 +39,9 @@ class ConversationMemory:
         
         # 配置
         self.window_size = window_size  # 保留的消息数量（对话条数）
+
+        # [新增] 日志读取缓存：(mtime_ns, size, history)，文件未变化时跳过 JSON 解析
+        self._log_cache = None
         
         self._ensure_dir()
 
@@ -34,25 +51,40 @@ class ConversationMemory:
     # --- 磁盘 I/O ---
 
     def _read_full_log(self) -> List[Dict]:
-        """从磁盘读取完整日志"""
-        if os.path.exists(self.save_path):
-            try:
-                with open(self.save_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        return data
-                    return []
-            except Exception:
-                return []
-        return []
+        """从磁盘读取完整日志 (按 mtime/size 缓存，返回浅拷贝供调用方修改)"""
+        try:
+            st = os.stat(self.save_path)
+        except OSError:
+            self._log_cache = None
+            return []
+
+        cache = self._log_cache
+        if cache and cache[0] == st.st_mtime_ns and cache[1] == st.st_size:
+            return list(cache[2])
+
+        try:
+            with open(self.save_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            return []
+        if not isinstance(data, list):
+            return []
+        self._log_cache = (st.st_mtime_ns, st.st_size, data)
+        return list(data)
 
     def _write_full_log(self, history_list):
         """写入完整日志到磁盘"""
         try:
             with open(self.save_path, 'w', encoding='utf-8') as f:
                 json.dump(history_list, f, ensure_ascii=False, indent=2)
+            # [新增] 写入后直接刷新缓存，下一次读取无需重新解析
+            st = os.stat(self.save_path)
+            self._log_cache = (st.st_mtime_ns, st.st_size, list(history_list))
         except Exception as e:
+            self._log_cache = None
             print(f"Error saving memory: {e}")
+        # [新增] 预览 / 消息数已变化，失效会话列表缓存
+        invalidate_sessions_cache(self.base_dir)
 
     def load_summary(self) -> str:
         """读取当前的对话摘要"""
@@ -210,10 +242,16 @@ class ConversationMemory:
 
         # 过滤掉纯 System 消息，除非包含 Supervisor 指令（需要让 AI 看到）
         # 注意：这里的 'system' role 指的是内部注入的日志，不是 Prompt 里的 System Prompt
-        conversation_msgs = [m for m in full_history if m.get('role') != 'system' or 'Supervisor' in m.get('content', '')]
-
+        # [修改点] 从尾部向前收集，凑满 window_size 条即停止，
+        # 不再对整段历史做过滤 + 切片 (长会话下每轮 O(N) -> O(window))
+        context_msgs = []
+        for m in reversed(full_history):
+            if m.get('role') != 'system' or 'Supervisor' in m.get('content', ''):
+                context_msgs.append(m)
+                if len(context_msgs) >= self.window_size:
+                    break
         # 简单的滑动窗口：获取最近的 window_size 条
-        context_msgs = conversation_msgs[-self.window_size:]
+        context_msgs.reverse()
 
         # 执行格式清洗（修复断裂的 Tool Chain）
         sanitized = self._sanitize_context(context_msgs)
@@ -278,6 +316,7 @@ class ConversationMemory:
             self.summary_path = new_summary_path
             
         self.session_id = new_name
+        invalidate_sessions_cache(self.base_dir)
         return True
 
     def delete_message(self, message_index: int):
@@ -291,15 +330,28 @@ class ConversationMemory:
 
     @staticmethod
     def list_sessions(base_dir="logs/sessions"):
-        """列出所有现有会话，包括元数据"""
+        """列出所有现有会话，包括元数据 (带短 TTL 缓存)"""
+        cache_key = os.path.normpath(base_dir)
+        cached = _sessions_cache.get(cache_key)
+        if cached and time.time() - cached[0] < SESSIONS_CACHE_TTL:
+            return list(cached[1])
+
         if not os.path.exists(base_dir):
             return []
         files = glob.glob(os.path.join(base_dir, "*.json"))
         sessions = []
         for f in files:
             try:
+                st = os.stat(f)
+                # [新增] 单个会话文件的元数据按 (mtime, size) 缓存，
+                # TTL 过期后只重新解析真正发生变化的会话文件
+                meta_cached = _session_meta_cache.get(f)
+                if meta_cached and meta_cached[0] == st.st_mtime_ns and meta_cached[1] == st.st_size:
+                    sessions.append(dict(meta_cached[2]))
+                    continue
+
                 name = os.path.basename(f).replace(".json", "")
-                mtime = os.path.getmtime(f)
+                mtime = st.st_mtime
                 # 简单读取最后一条消息作为预览
                 with open(f, 'r', encoding='utf-8') as read_f:
                     data = json.load(read_f)
@@ -310,18 +362,21 @@ class ConversationMemory:
                         if not preview and last_msg.get('tool_calls'):
                             preview = f"[Tool Call: {last_msg['tool_calls'][0]['function']['name']}]"
                 
-                sessions.append({
+                entry = {
                     "id": name,
                     "updated_at": mtime,
                     "preview": preview,
                     "message_count": len(data) if data else 0
-                })
+                }
+                _session_meta_cache[f] = (st.st_mtime_ns, st.st_size, entry)
+                sessions.append(dict(entry))
             except Exception:
                 continue
                 
         # 按修改时间排序（新的在前）
         sessions.sort(key=lambda x: x['updated_at'], reverse=True)
-        return sessions
+        _sessions_cache[cache_key] = (time.time(), sessions)
+        return list(sessions)
 
     @staticmethod
     def delete_session(session_id, base_dir="logs/sessions"):
@@ -334,5 +389,6 @@ class ConversationMemory:
             deleted = True
         if os.path.exists(summary_path):
             os.remove(summary_path)
-            
+
+        invalidate_sessions_cache(base_dir)
         return deleted
\ No newline at end of file
@@ -3,17 +3,23 @@ import os
 import uuid
 import datetime
 import sys
-import pandas as pd
 import logging
 import traceback
 import math
 import re
-from collections import Counter
+import threading
+from collections import Counter, OrderedDict
 from typing import List, Dict, Any
 
 # 配置日志
 logger = logging.getLogger("RAGStore")
 
+# [新增] 查询向量 LRU 缓存容量：同一句话 (去重检查 + 检索 + 前端重复查询) 只做一次 ONNX 嵌入
+QUERY_EMBEDDING_CACHE_SIZE = 256
+
+# [新增] 记忆导出 DataFrame 的固定列顺序 (前端 MemoryManager 依赖这些字段)
+MEMORY_DF_COLUMNS = ['type', 'content', 'access_count', 'timestamp', 'last_accessed', 'id']
+
 # --- [新增] BM25 算法实现 ---
 class BM25:
     def __init__(self, corpus: List[str], k1=1.5, b=0.75):
@@ -117,6 +123,15 @@ class RAGStore:
         # [新增] 内存中的 BM25 索引缓存
         self.bm25_index = None
         self.memory_docs_cache = [] # 存储 (id, text, metadata) 的列表，与 BM25 索引对应
+
+        # [新增] 数据版本号：任何写操作 (增/删/访问统计) 都会自增，
+        # 记忆导出 DataFrame 按版本号缓存，数据未变化时直接复用
+        self.data_version = 0
+        self._df_cache = None  # (data_version, DataFrame)
+
+        # [新增] 查询文本 -> 嵌入向量 的 LRU 缓存
+        self._query_embedding_cache = OrderedDict()
+        self._query_embedding_lock = threading.Lock()
         
         # 确保目录存在
         if not os.path.exists(self.persistence_path):
@@ -155,6 +170,9 @@ class RAGStore:
                 embedding_function=self.embedding_function
             )
             
+            # 重新连接后集合可能已被外部修改，使导出缓存失效
+            self._bump_version()
+
             count = self.collection.count()
             print(f"[RAG System]: ✅ Successfully connected. Records: {count}")
             
@@ -225,6 +243,30 @@ class RAGStore:
         print("[RAG Info]: Connection lost or not initialized. Retrying connection...")
         return self._initialize_db()
 
+    def _embed_query(self, text):
+        """[新增] 计算查询文本的嵌入向量，带 LRU 缓存"""
+        with self._query_embedding_lock:
+            emb = self._query_embedding_cache.get(text)
+            if emb is not None:
+                self._query_embedding_cache.move_to_end(text)
+                return emb
+
+        emb = self.embedding_function([text])[0]
+        if hasattr(emb, 'tolist'):
+            emb = emb.tolist()
+
+        with self._query_embedding_lock:
+            self._query_embedding_cache[text] = emb
+            if len(self._query_embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+                self._query_embedding_cache.popitem(last=False)
+        return emb
+
+    def _query(self, text, **kwargs):
+        """[新增] collection.query 的包装：优先使用缓存的查询向量，避免重复嵌入"""
+        if self.embedding_function is None:
+            return self.collection.query(query_texts=[text], **kwargs)
+        return self.collection.query(query_embeddings=[self._embed_query(text)], **kwargs)
+
     # --- [修改点 - 需求②] 新增相似度计算方法 ---
     def calculate_similarity(self, text: str) -> float:
         """
@@ -241,8 +283,8 @@ class RAGStore:
 
         # 1. Semantic Search
         try:
-            sem_results = self.collection.query(
-                query_texts=[text],
+            sem_results = self._query(
+                text,
                 n_results=1, # 只需要最相似的那一个
                 include=['distances']
             )
@@ -293,6 +335,7 @@ class RAGStore:
                 metadatas=[metadata],
                 ids=[str(uuid.uuid4())]
             )
+            self._bump_version()
             # [新增] 插入数据后，简单的做法是重建索引 (或者可以优化为增量更新)
             # 为了数据一致性，这里选择重建（假设写入频率远低于读取）
             self._rebuild_bm25_index()
@@ -329,8 +372,8 @@ class RAGStore:
             return []
 
     def _search_semantic(self, query_text, n_results):
-        results = self.collection.query(
-            query_texts=[query_text],
+        results = self._query(
+            query_text,
             n_results=n_results
         )
         if results and results['ids'] and results['ids'][0]:
@@ -344,8 +387,8 @@ class RAGStore:
     def _search_hybrid_time(self, query_text, n_results):
         """语义 + 时间衰减"""
         candidates_k = min(n_results * 3, self.collection.count())
-        results = self.collection.query(
-            query_texts=[query_text],
+        results = self._query(
+            query_text,
             n_results=candidates_k,
             include=['documents', 'metadatas', 'distances']
         )
@@ -394,8 +437,8 @@ class RAGStore:
         top_k_candidates = min(n_results * 4, self.collection.count())
         
         # Semantic Search
-        sem_results = self.collection.query(
-            query_texts=[query_text],
+        sem_results = self._query(
+            query_text,
             n_results=top_k_candidates,
             include=['documents', 'metadatas', 'distances']
         )
@@ -485,11 +528,18 @@ class RAGStore:
             m['last_accessed'] = datetime.datetime.now().isoformat()
             new_metas.append(m)
         self.collection.update(ids=ids, metadatas=new_metas)
+        self._bump_version()
+
+    def _bump_version(self):
+        """[新增] 标记数据已变化，使导出缓存失效"""
+        self.data_version += 1
+        self._df_cache = None
 
     def delete_memory(self, memory_id):
         if not self._ensure_connection(): return False
         try:
             self.collection.delete(ids=[memory_id])
+            self._bump_version()
             # 删除后重建索引以保持一致
             self._rebuild_bm25_index()
             return True
@@ -501,16 +551,25 @@ class RAGStore:
         """
         导出所有记忆，带自动重连和容错处理。
         """
+        # [修改点] pandas 仅在记忆导出时使用，延迟导入以缩短后端冷启动时间
+        import pandas as pd
+
         # 1. 尝试连接
         if not self._ensure_connection():
             # 再次失败，返回空 DF 防止前端崩溃
             print("[RAG Warning]: Could not connect to DB for exporting.")
-            return pd.DataFrame(columns=['type', 'content', 'access_count', 'timestamp', 'last_accessed', 'id'])
+            return pd.DataFrame(columns=MEMORY_DF_COLUMNS)
+
+        # [新增] 数据版本未变化时复用上次导出结果 (返回副本，防止调用方修改缓存)
+        cached = self._df_cache
+        if cached and cached[0] == self.data_version:
+            return cached[1].copy()
+        version = self.data_version
 
         try:
             count = self.collection.count()
             if count == 0:
-                return pd.DataFrame(columns=['type', 'content', 'access_count', 'timestamp', 'last_accessed', 'id'])
+                return pd.DataFrame(columns=MEMORY_DF_COLUMNS)
 
             # 2. 获取数据
             all_data = self.collection.get(
@@ -518,50 +577,51 @@ class RAGStore:
                 include=['metadatas', 'documents']
             )
 
-            records = []
             ids = all_data['ids']
             docs = all_data['documents']
-            metas = all_data['metadatas']
-
-            for i, uid in enumerate(ids):
-                item = metas[i] if metas[i] else {}
-                # 创建副本，防止修改原始引用
-                row = item.copy()
-                row['id'] = uid
-                row['content'] = docs[i] if docs[i] else ""
-                records.append(row)
-
-            df = pd.DataFrame(records)
-
-            # 3. 数据清洗 (Schema Enforcement)
-            required_cols = ['type', 'content', 'access_count', 'timestamp', 'last_accessed', 'id']
-            for col in required_cols:
-                if col not in df.columns:
-                    if col == 'access_count': df[col] = 0
-                    elif col == 'content': df[col] = ""
-                    else: df[col] = "unknown"
-
-            # 填充 NaN
-            df['type'] = df['type'].fillna('unknown').astype(str)
-            df['content'] = df['content'].fillna('').astype(str)
-            df['access_count'] = df['access_count'].fillna(0).astype(int)
+            metas = [m if m else {} for m in all_data['metadatas']]
 
+            # [修改点] 时间字段在构建列时一次性清洗 (缺失/空串 -> 当前时间)，
+            # 取代之后对两列逐元素 Series.apply 的额外两轮扫描
             now_iso = datetime.datetime.now().isoformat()
             def clean_time(val):
-                if pd.isna(val) or str(val).strip() == "": return now_iso
-                return str(val)
+                if val is None or val != val: return now_iso  # None / NaN
+                val = str(val)
+                return val if val.strip() else now_iso
+
+            # [修改点] 按列直接构建 DataFrame (列式而非逐行 dict)，并显式指定列与 dtype，
+            # 省去 pandas 对 list-of-dicts 的逐行 key 反射与类型推断
+            columns = {
+                'type': pd.Series([m.get('type') for m in metas], dtype=object),
+                'content': pd.Series([d if d else "" for d in docs], dtype=object),
+                'access_count': pd.Series([m.get('access_count') for m in metas], dtype=object),
+                'timestamp': pd.Series([clean_time(m.get('timestamp')) for m in metas], dtype=object),
+                'last_accessed': pd.Series([clean_time(m.get('last_accessed')) for m in metas], dtype=object),
+                'id': pd.Series(ids, dtype=object),
+            }
+            # [修复] 其余元数据 (source / session / original_user_input 等) 按首次出现顺序追加在固定列之后，
+            # 缺失值填空串 (与原先逐行构建后 fillna("") 的结果一致)
+            extra_keys = list(dict.fromkeys(k for m in metas for k in m if k not in columns))
+            for key in extra_keys:
+                columns[key] = pd.Series([
+                    "" if m.get(key) is None else m.get(key) for m in metas
+                ], dtype=object)
+            df = pd.DataFrame(columns, columns=MEMORY_DF_COLUMNS + extra_keys)
+
+            # 填充 NaN (Schema Enforcement)
+            df['type'] = df['type'].fillna('unknown').astype(str)
+            df['content'] = df['content'].astype(str)
+            df['access_count'] = pd.to_numeric(df['access_count'], errors='coerce').fillna(0).astype('int64')
 
-            df['timestamp'] = df['timestamp'].apply(clean_time)
-            df['last_accessed'] = df['last_accessed'].apply(clean_time)
-            
-            df = df.fillna("") # 兜底清洗
+            # 各列均已在构建时完成清洗，无需再做整表 fillna 兜底
 
-            return df
+            self._df_cache = (version, df)
+            return df.copy()
 
         except Exception as e:
             print(f"[RAG Error] DataFrame Export Failed: {e}")
             traceback.print_exc()
-            return pd.DataFrame(columns=['type', 'content', 'access_count', 'timestamp', 'last_accessed', 'id'])
+            return pd.DataFrame(columns=MEMORY_DF_COLUMNS)
 
     def count(self):
         if self._ensure_connection():
@@ -1,13 +1,13 @@
 # backend/core/skill_manager.py
 import os
 import sys
-import yaml
 import json
 import shutil
 import subprocess
 import logging
 import re
 from typing import Dict, List, Any, Optional, Tuple
+from utils import fast_yaml
 
 logger = logging.getLogger("SkillManager")
 
@@ -39,6 +39,8 @@ class SkillManager:
         # 缓存已加载的技能定义
         # 缓存：name -> {path, metadata, tools_schema}
         self.skill_registry: Dict[str, Any] = {}
+        # [新增] 注册表版本号：每次重新扫描自增，供上层缓存判断是否失效
+        self.registry_version = 0
         
         # 1. 迁移遗留脚本 (Legacy Scripts -> New Skills)
         self.migrate_legacy_scripts()
@@ -154,6 +156,7 @@ if __name__ == "__main__":
         不加载全部内容，只加载元数据。
         """
         self.skill_registry.clear()
+        self.registry_version += 1
         
         if not os.path.exists(self.skills_root):
             return
@@ -175,7 +178,7 @@ if __name__ == "__main__":
                 # 简单的 Frontmatter 解析器
                 match = re.match(r'^---\s*\n(.*?)\n---\s*\n', content, re.DOTALL)
                 if match:
-                    metadata = yaml.safe_load(match.group(1))
+                    metadata = fast_yaml.load(match.group(1))
                     description = metadata.get('description', 'No description.')
                     
                     self.skill_registry[dirname] = {
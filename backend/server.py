@@ -8,6 +8,7 @@ import logging
 import threading
 import time
 import re
+import secrets
 import queue  # 标准库 queue
 from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
@@ -15,9 +16,6 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Body
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-# 引入 win11toast 用于桌面通知
-from win11toast import toast
-
 
 # 调整路径以便导入 core
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -74,6 +72,8 @@ class GlobalState:
         """优雅关闭"""
         logger.info("Shutting down executor...")
         self.executor.shutdown(wait=False)
+        # [新增] 结束常驻 PowerShell 会话 (若已开启)
+        self.agent.toolbox.close()
 
 state = GlobalState()
 
@@ -159,31 +159,35 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+# [新增] 流式推送时每发送 N 个事件主动让出一次事件循环
+STREAM_YIELD_EVERY = 16
+
 # --- [核心修改] 线程安全的 Chat 执行器 ---
-# 这个函数在独立的线程池中运行，通过 asyncio.run_coroutine_threadsafe 将结果推回主 Loop 的 Queue
+# 这个函数在独立的线程池中运行，通过 loop.call_soon_threadsafe 将结果推回主 Loop 的 Queue
 def run_sync_chat_generator(agent_instance, user_input, session_id, async_queue, loop):
     """
     包装器：在线程中运行同步的 agent.chat 生成器，
     并将生成的 item 放入 async_queue 中供 WebSocket 消费。
     """
+    # [修改点] 队列无上限，put_nowait 不会阻塞；用 call_soon_threadsafe 直接投递，
+    # 避免每个 token 都创建一个协程 + concurrent Future (run_coroutine_threadsafe) 的开销
+    def push(event):
+        loop.call_soon_threadsafe(async_queue.put_nowait, event)
+
     try:
         # 执行同步生成器
         # [修改点] 这里的 agent.chat 现在是线程安全的，因为我们在 host_agent.py 中移除了对 self.active_session_id 的依赖
         for event in agent_instance.chat(user_input, session_id=session_id):
-            # 必须使用 run_coroutine_threadsafe 跨线程调用 async 方法
-            asyncio.run_coroutine_threadsafe(async_queue.put(event), loop)
+            push(event)
         
         # 完成信号
-        asyncio.run_coroutine_threadsafe(async_queue.put({"type": "done", "session_id": session_id}), loop)
+        push({"type": "done", "session_id": session_id})
         
     except Exception as e:
         import traceback
         error_msg = f"Internal Agent Error: {str(e)}\n{traceback.format_exc()}"
         logger.error(error_msg)
-        asyncio.run_coroutine_threadsafe(
-            async_queue.put({"type": "error", "content": error_msg, "session_id": session_id}), 
-            loop
-        )
+        push({"type": "error", "content": error_msg, "session_id": session_id})
 
 # --- [核心修改] 哨兵自动响应逻辑 ---
 
@@ -240,7 +244,8 @@ async def run_autonomous_reaction(trigger_message: str):
     结果会实时流式传输到 WebSocket，最后通过 Toast 弹窗通知。
     """
     # [修复Bug 3] 为哨兵触发创建独立的会话
-    new_session_id = f"sentinel_{int(time.time())}"
+    # [修改点] 秒级时间戳在同一秒内多次触发会撞名；改用 CSPRNG 随机后缀 (token_hex 直接编码随机字节)
+    new_session_id = f"sentinel_{int(time.time())}_{secrets.token_hex(4)}"
     logger.info(f"[Auto-Reaction] Creating new session for sentinel: {new_session_id}")
 
     # 1. 先创建会话
@@ -281,12 +286,17 @@ async def run_autonomous_reaction(trigger_message: str):
     )
 
     # 6. 消费队列并广播
+    sent = 0
     while True:
         event = await event_queue.get()
         event["session_id"] = new_session_id
 
         # 实时推送
         await manager.broadcast(event)
+        # [新增] 定期让出事件循环，避免流式输出饿死其他协程
+        sent += 1
+        if sent % STREAM_YIELD_EVERY == 0:
+            await asyncio.sleep(0)
 
         if event["type"] == "delta":
             full_response_text += (event.get("content") or "")
@@ -323,6 +333,8 @@ async def run_autonomous_reaction(trigger_message: str):
         display_text = clean_text[:120] + "..." if len(clean_text) > 120 else clean_text
         
         try:
+            # [修改点] win11toast 仅在哨兵弹窗时使用，延迟导入 (加载 WinRT 绑定较慢)
+            from win11toast import toast
             toast("Resonance AI (Sentinel Response)", display_text)
         except Exception as e:
             logger.error(f"Windows Toast Error: {e}")
@@ -409,22 +421,29 @@ async def get_preferences():
 @app.post("/api/config/preferences")
 async def update_preferences(prefs: UserPreferencesUpdate):
     """更新用户偏好设置并持久化"""
-    if 'preferences' not in state.agent.user_data:
-        state.agent.user_data['preferences'] = {}
-    
-    state.agent.user_data['preferences'].update(prefs.dict())
-    
-    # 持久化到文件
-    import yaml
-    with open(state.agent.user_profile_path, 'w', encoding='utf-8') as f:
-        yaml.dump(state.agent.user_data, f, allow_unicode=True)
-    
-    # 刷新 Agent 内部状态
-    state.agent.load_all_configs()
-    return {"status": "success", "preferences": state.agent.user_data['preferences']}
+    # 持久化到文件 (内容未变化时跳过写入)
+    # [修改点] 修改与磁盘写入放到线程池执行，不阻塞事件循环 (WebSocket 推流不受影响)
+    loop = asyncio.get_running_loop()
+    preferences = await loop.run_in_executor(state.executor, _save_preferences, prefs.dict())
+    return {"status": "success", "preferences": preferences}
+
+
+def _save_preferences(values):
+    """[新增] 在配置锁内修改并保存偏好设置，避免与画像的延迟落盘并发修改 / 写入 user_data"""
+    with state.agent.config_lock:
+        if 'preferences' not in state.agent.user_data:
+            state.agent.user_data['preferences'] = {}
+
+        state.agent.user_data['preferences'].update(values)
+        state.agent.save_user_profile()
+        return dict(state.agent.user_data['preferences'])
 
 # --- [修复] SKILLS MANAGEMENT APIs ---
 
+# [新增] 技能列表响应缓存：key 为 (注册表版本, legacy scripts 对象)，
+# 技能重新扫描或配置重新加载 (生成新的 scripts dict) 时自动失效
+_skills_list_cache = {"key": None, "payload": None}
+
 @app.get("/api/skills/list")
 async def list_skills():
     """获取所有技能（包括内置 Scripts 和 导入的 Skills）"""
@@ -433,7 +452,12 @@ async def list_skills():
     
     # 2. [修复点] 获取真实加载的技能注册表 (SkillManager Registry)
     # 不再依赖 config['imported_skills']，而是直接读取 SkillManager 扫描到的内容
-    registry = state.agent.skill_manager.skill_registry
+    skill_manager = state.agent.skill_manager
+    registry = skill_manager.skill_registry
+
+    cache_key = (skill_manager.registry_version, id(legacy))
+    if _skills_list_cache["key"] == cache_key:
+        return _skills_list_cache["payload"]
     
     # 转换为前端友好的格式
     imported = {}
@@ -446,10 +470,13 @@ async def list_skills():
             "commands": data.get('metadata', {}).get('commands', [])
         }
     
-    return {
+    payload = {
         "legacy": legacy,
         "imported": imported
     }
+    _skills_list_cache["key"] = cache_key
+    _skills_list_cache["payload"] = payload
+    return payload
 
 @app.post("/api/skills/learn")
 async def learn_skill_endpoint(payload: SkillLearnRequest):
@@ -489,7 +516,9 @@ async def learn_skill_endpoint(payload: SkillLearnRequest):
 async def delete_skill(skill_name: str):
     """删除已学习的技能"""
     try:
-        success = state.agent.skill_manager.delete_skill(skill_name)
+        # [修改点] 删除技能目录并重新扫描注册表，放到线程池执行
+        loop = asyncio.get_running_loop()
+        success = await loop.run_in_executor(state.executor, state.agent.skill_manager.delete_skill, skill_name)
         if not success:
             raise HTTPException(status_code=404, detail="Skill not found")
         return {"status": "deleted", "skill": skill_name}
@@ -595,7 +624,9 @@ async def clear_session_messages(session_id: str):
 async def get_all_memories():
     """获取所有长期记忆（RAG）"""
     # [修改说明] 这里的 logic 移到了 rag_store.py 内部处理 robustness，这里只负责透传
-    df = state.agent.rag_store.get_all_memories_as_df()
+    # [修改点] 读取向量库放到线程池执行，不阻塞事件循环
+    loop = asyncio.get_running_loop()
+    df = await loop.run_in_executor(state.executor, state.agent.rag_store.get_all_memories_as_df)
     
     # 再次确保转为字典列表，处理可能的空 DataFrame
     if df.empty:
@@ -607,7 +638,8 @@ async def get_all_memories():
 @app.delete("/api/memory/{memory_id}")
 async def delete_memory(memory_id: str):
     """删除指定 ID 的记忆"""
-    success = state.agent.rag_store.delete_memory(memory_id)
+    loop = asyncio.get_running_loop()
+    success = await loop.run_in_executor(state.executor, state.agent.rag_store.delete_memory, memory_id)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to delete memory")
     return {"status": "deleted", "id": memory_id}
@@ -639,7 +671,36 @@ async def save_profile(profile: ProfileUpdate):
     current_profiles = state.agent.profiles
     
     # 2. 更新或插入
-    profile_data = {
+    current_profiles[profile.profile_id] = _profile_to_dict(profile)
+    
+    # 3. 持久化
+    state.agent.update_config(new_profiles=current_profiles)
+    
+    return {"status": "success", "profile_id": profile.profile_id}
+
+# [新增] 批量保存 Profile 接口：多个 Profile 的修改合并后只写一次 YAML、只重载一次配置
+# (前端 "全部应用" 按钮一次性提交所有暂存的修改)
+@app.post("/api/config/profiles/batch")
+async def save_profiles_batch(profiles: List[ProfileUpdate]):
+    """批量新增或修改模型 Profile"""
+    # [修改点] YAML 写入 + 配置重载放到线程池执行，不阻塞事件循环
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(state.executor, _save_profiles, [(p.profile_id, _profile_to_dict(p)) for p in profiles])
+
+    return {"status": "success", "profile_ids": [p.profile_id for p in profiles]}
+
+
+def _save_profiles(items):
+    """[新增] 在配置锁内合并 Profile 修改并持久化 (只写一次 profiles.yaml)"""
+    with state.agent.config_lock:
+        current_profiles = state.agent.profiles
+        for profile_id, data in items:
+            current_profiles[profile_id] = data
+        state.agent.update_config(new_profiles=current_profiles)
+
+def _profile_to_dict(profile: ProfileUpdate) -> dict:
+    """将请求模型转换为 profiles.yaml 中的存储格式"""
+    return {
         "name": profile.name or profile.profile_id,
         "api_key": profile.api_key,
         "base_url": profile.base_url,
@@ -647,13 +708,6 @@ async def save_profile(profile: ProfileUpdate):
         "temperature": profile.temperature,
         "provider": profile.provider
     }
-    
-    current_profiles[profile.profile_id] = profile_data
-    
-    # 3. 持久化
-    state.agent.update_config(new_profiles=current_profiles)
-    
-    return {"status": "success", "profile_id": profile.profile_id}
 
 # [新增] 删除 Profile 接口
 @app.delete("/api/config/profiles/{profile_id}")
@@ -672,37 +726,29 @@ async def delete_profile(profile_id: str):
     return {"status": "deleted"}
 
 
+# [修改点] 以下接口的 psutil / 向量库 / 磁盘操作都是阻塞调用 (进程枚举可达数百毫秒)，
+# 统一放到线程池执行，事件循环继续处理 WebSocket 推流与其他请求
+
+def _process_records(limit):
+    return SystemMonitor.get_process_list(limit=limit).to_dict(orient="records")
+
 @app.get("/api/system/metrics")
 async def get_system_metrics():
     """获取实时 CPU、内存、电池指标"""
-    return SystemMonitor.get_system_metrics()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(state.executor, SystemMonitor.get_system_metrics)
 
 @app.get("/api/system/processes")
 async def get_system_processes():
     """获取占用资源最高的进程列表"""
-    df = SystemMonitor.get_process_list(limit=15)
-    return df.to_dict(orient="records")
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(state.executor, _process_records, 15)
 
 @app.get("/api/system/disk")
 async def get_disk_status():
     """获取磁盘使用情况"""
-    return SystemMonitor.get_disk_usage()
-
-# --- SKILL MANAGEMENT APIs ---
-# [注意] 第一个 /api/skills/list 和 /api/skills/learn 定义在第428行和454行
-# 用于获取真实的skill注册表
-
-@app.delete("/api/skills/{skill_name}")
-async def delete_skill(skill_name: str):
-    """删除已学习的技能"""
-    try:
-        success = state.agent.skill_manager.delete_skill(skill_name)
-        if not success:
-            raise HTTPException(status_code=404, detail="Skill not found")
-        return {"status": "deleted", "skill": skill_name}
-    except Exception as e:
-        logger.error(f"Delete skill failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(state.executor, SystemMonitor.get_disk_usage)
 
 # --- [核心修复] 全双工 WebSocket Chat Endpoint ---
 @app.websocket("/ws/chat")
@@ -715,6 +761,7 @@ async def websocket_chat(websocket: WebSocket):
     
     # 1. 定义 Sender 任务：持续从队列取数据发给前端
     async def sender_task():
+        sent = 0
         try:
             while True:
                 # 这一行会异步等待队列有新数据
@@ -724,6 +771,12 @@ async def websocket_chat(websocket: WebSocket):
                 except Exception as e:
                     logger.error(f"WS Send Error: {e}")
                     break
+
+                # [新增] 队列积压时 get()/send 可能都不挂起，定期主动让出事件循环，
+                # 保证 /stop 指令和其他请求能及时得到处理
+                sent += 1
+                if sent % STREAM_YIELD_EVERY == 0:
+                    await asyncio.sleep(0)
                 
                 # 如果收到完成或错误信号，并不退出循环，因为用户可能发下一条消息
                 # 但如果是 'done'，我们可以标记任务结束（视具体逻辑而定）
@@ -804,27 +857,6 @@ async def websocket_chat(websocket: WebSocket):
         # 清理 Sender 任务
         sender_future.cancel()
 
-# --- 静态文件服务 ---
-# backend/server.py (补全部分)
-
-@app.get("/api/system/metrics")
-async def get_system_metrics():
-    """获取实时 CPU、内存、电池指标"""
-    # 直接调用你原始代码中的 SystemMonitor
-    return SystemMonitor.get_system_metrics()
-
-@app.get("/api/system/processes")
-async def get_system_processes():
-    """获取占用资源最高的进程列表"""
-    # 原始逻辑返回的是 Pandas DataFrame，我们需要转为 JSON 列表
-    df = SystemMonitor.get_process_list(limit=15)
-    return df.to_dict(orient="records")
-
-@app.get("/api/system/disk")
-async def get_disk_status():
-    """获取磁盘使用情况"""
-    return SystemMonitor.get_disk_usage()
-
 # --- 静态文件服务 (生产环境) ---
 # 假设前端 build 后的文件在 frontend/dist
 # 如果是开发模式，可以注释掉这里
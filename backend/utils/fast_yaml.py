@@ -0,0 +1,123 @@
+# utils/fast_yaml.py
+import os
+import json
+import hashlib
+import tempfile
+import yaml
+
+# 优先使用 libyaml 的 C 实现 (CSafeLoader / CSafeDumper)，比纯 Python 实现快一个数量级。
+# 未安装 libyaml 时自动回退到纯 Python 的 SafeLoader / SafeDumper，行为保持一致。
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+# [新增] JSON 旁路缓存：YAML 仍是唯一的真实配置源 (可手动编辑)，
+# 同目录下的 <name>.yaml.json 只是解析结果的快照，json.load 比 YAML 解析快一到两个数量级。
+# [修改点] 快照记录生成时 YAML 的 (mtime_ns, size)，读取时要求完全一致：
+# 以旧 mtime 恢复 / 编辑的 YAML (cp -p、保留 mtime 的编辑器、粗粒度 mtime 的文件系统) 不会命中过期快照
+SIDECAR_SUFFIX = ".json"
+
+# 新建文件的默认权限 (按进程 umask；导入时读取一次，os.umask 本身不是线程安全的)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+NEW_FILE_MODE = 0o666 & ~_UMASK
+
+
+def load(stream):
+    """等价于 yaml.safe_load，但走 C 加速的 Loader"""
+    return yaml.load(stream, Loader=YAML_LOADER)
+
+
+def dump(data, stream=None, **kwargs):
+    """等价于 yaml.safe_dump，但走 C 加速的 Dumper"""
+    return yaml.dump(data, stream, Dumper=YAML_DUMPER, **kwargs)
+
+
+def _atomic_write(path, write_fn):
+    """
+    [新增] 原子写入：先写同目录临时文件，再 os.replace 覆盖目标。
+    进程崩溃或断电时不会留下写了一半的配置文件。
+    [修改点] 临时文件名由 mkstemp 生成且唯一，并发写同一文件时不会互相截断或抢走对方的临时文件
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            write_fn(f)
+        # mkstemp 创建的文件权限为 0600，沿用原文件的权限 (新文件按 umask)
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = NEW_FILE_MODE
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _has_only_str_keys(data):
+    """[新增] 检查数据中所有字典键是否都是字符串 (JSON 会把 1: 之类的非字符串键变成 "1")"""
+    if isinstance(data, dict):
+        return all(isinstance(k, str) and _has_only_str_keys(v) for k, v in data.items())
+    if isinstance(data, list):
+        return all(_has_only_str_keys(v) for v in data)
+    return True
+
+
+def _source_key(st):
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _write_sidecar(path, data, st):
+    """
+    写入 JSON 快照 (附带 YAML 的 stat 标识)；数据无法 JSON 序列化或目录只读时静默跳过。
+    [修改点] 含非字符串键的数据经 JSON 往返后类型会变，不写快照，始终解析 YAML
+    """
+    sidecar = path + SIDECAR_SUFFIX
+    if not _has_only_str_keys(data):
+        # 删除可能残留的旧快照，避免其与 YAML 不一致
+        try:
+            os.remove(sidecar)
+        except OSError:
+            pass
+        return
+    snapshot = {"source": _source_key(st), "data": data}
+    try:
+        _atomic_write(sidecar, lambda f: json.dump(snapshot, f, ensure_ascii=False))
+    except (TypeError, ValueError, OSError):
+        pass
+
+
+def load_file(path):
+    """
+    读取 YAML 文件。若 JSON 快照记录的 (mtime_ns, size) 与 YAML 当前状态一致，直接读取快照；
+    否则解析 YAML 并刷新快照 (YAML 被手动修改后会自动失效)。
+    """
+    st = os.stat(path)
+    try:
+        with open(path + SIDECAR_SUFFIX, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        if isinstance(snapshot, dict) and snapshot.get("source") == _source_key(st):
+            return snapshot.get("data")
+    except (OSError, ValueError):
+        pass
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = load(f)
+    _write_sidecar(path, data, st)
+    return data
+
+
+def dump_file(data, path, **kwargs):
+    """原子写入 YAML 文件，并同步刷新 JSON 快照"""
+    _atomic_write(path, lambda f: dump(data, f, **kwargs))
+    _write_sidecar(path, data, os.stat(path))
+
+
+def digest(data):
+    """[新增] 计算配置数据的内容摘要 (键排序)，用于判断保存时内容是否真的发生变化"""
+    raw = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
@@ -1,13 +1,43 @@
 # utils/monitor.py
 import psutil
 import datetime
-import pandas as pd
+import time
+import functools
+import threading
+
+# [新增] 监控数据短 TTL 缓存：前端每 3 秒轮询且多个组件会同时请求，
+# 进程枚举开销较大，TTL 内直接返回上一次的采样结果。
+METRICS_CACHE_TTL = 2
+
+def _ttl_cache(ttl):
+    """按参数缓存函数结果 ttl 秒 (线程安全，适用于 run_in_threadpool 并发调用)"""
+    def decorator(func):
+        cache = {}
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            with lock:
+                hit = cache.get(key)
+                if hit and now - hit[0] < ttl:
+                    return hit[1]
+            result = func(*args, **kwargs)
+            with lock:
+                cache[key] = (now, result)
+            return result
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
 
 class SystemMonitor:
     """
     负责监控宿主机的系统状态。
     """
     @staticmethod
+    @_ttl_cache(METRICS_CACHE_TTL)
     def get_system_metrics():
         """获取CPU、内存、电池等基础信息"""
         try:
@@ -31,8 +61,12 @@ class SystemMonitor:
             }
 
     @staticmethod
+    @_ttl_cache(METRICS_CACHE_TTL)
     def get_process_list(limit=10):
         """获取占用资源最高的进程列表"""
+        # [修改点] pandas 仅用于进程表排序，延迟到首次调用时导入
+        import pandas as pd
+
         processes = []
         try:
             for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
@@ -1,5 +1,5 @@
 // frontend/src/components/ChatInterface.jsx
-import React, { useState, useEffect, useRef } from 'react';
+import React, { useState, useEffect, useRef, useMemo, useCallback } from 'react';
 import { useTranslation } from 'react-i18next';
 import ReactMarkdown from 'react-markdown';
 import axios from 'axios';
@@ -13,11 +13,15 @@ import TaskMonitor from './TaskMonitor'; // [新增]
 const API_BASE = "http://localhost:8000/api";
 
 // [新增] 可折叠的 Tool Message 组件
-const ToolMessage = ({ name, content }) => {
+// [修改点] memo + useMemo：工具输出可能很大，序列化与预览截取只在 content 变化时计算一次，
+// 展开/折叠只切换 DOM，不再重复 JSON.stringify
+const ToolMessage = React.memo(({ name, content }) => {
     const [expanded, setExpanded] = useState(false);
     // 确保 content 是字符串以便处理
-    const safeContent = typeof content === 'string' ? content : JSON.stringify(content, null, 2);
-    const preview = safeContent.length > 100 ? safeContent.slice(0, 100) + "..." : safeContent;
+    const { safeContent, preview } = useMemo(() => {
+        const text = typeof content === 'string' ? content : JSON.stringify(content, null, 2);
+        return { safeContent: text, preview: text.length > 100 ? text.slice(0, 100) + "..." : text };
+    }, [content]);
     
     // [修复点] 确保工具名不为空时有显示，为空时显示 Unknown Tool
     const displayName = name || "system_call";
@@ -40,8 +44,112 @@ const ToolMessage = ({ name, content }) => {
             )}
         </div>
     );
+});
+
+// [新增] 按角色查表获取气泡样式，替代逐条消息的三元表达式链
+const BUBBLE_STYLES = {
+  user: 'bg-primary text-white rounded-tr-none',
+  tool: 'bg-slate-900 border border-slate-800 text-slate-300 font-mono text-xs w-full',
+  system: 'bg-amber-50 border border-amber-200 text-amber-800 w-full italic',
+  assistant: 'bg-surface border border-border text-text-primary rounded-tl-none',
 };
 
+// [修复点] 确保渲染内容始终为有效节点
+const renderMessageContent = (m) => {
+  if (m.role === 'tool') {
+      return <ToolMessage name={m.name} content={m.content} />;
+  }
+  
+  // 强制转换为字符串，防止“Objects are not valid as a React child”
+  const text = typeof m.content === 'string' ? m.content : JSON.stringify(m.content);
+  
+  return (
+      <div className="prose prose-sm max-w-none prose-slate">
+          <ReactMarkdown>
+              {text.replace(/<plan>[\s\S]*?<\/plan>/g, '*[Plan updated in Monitor]*') || ""}
+          </ReactMarkdown>
+      </div>
+  );
+};
+
+// [新增] 单条消息组件：流式输出时只有最后一条 assistant 消息对象会被替换，
+// 其余消息引用不变，memo 直接跳过其 Markdown 渲染 (O(Δ) 而非 O(N))。
+const MessageItem = React.memo(({ m }) => (
+  <div className={`flex gap-4 ${m.role === 'user' ? 'flex-row-reverse' : ''} animate-in fade-in slide-in-from-bottom-3 duration-500`}>
+    {/* 头像 */}
+    <div className={`w-9 h-9 rounded-xl flex items-center justify-center shrink-0 border shadow-sm
+      ${m.role === 'user' ? 'bg-primary border-primary text-white' : 'bg-surface border-border text-primary'}`}>
+      {m.role === 'user' ? <User size={18} /> : <Bot size={18} />}
+    </div>
+    
+    {/* 消息气泡 */}
+    <div className={`max-w-[85%] md:max-w-[75%] px-5 py-3.5 rounded-2xl text-[14.5px] leading-relaxed shadow-soft
+      ${BUBBLE_STYLES[m.role] || BUBBLE_STYLES.assistant}`}>
+      {renderMessageContent(m)}
+    </div>
+  </div>
+));
+
+// [新增] 长会话窗口化渲染：默认只挂载最近 RECENT_WINDOW 条消息，
+// 更早的消息通过 "显示更早消息" 按钮按 OLDER_STEP 条逐步展开
+const RECENT_WINDOW = 40;
+// [新增] 流式输出合并窗口 (ms)：约 20Hz 刷新，避免每个 token 都触发一次重渲染
+const DELTA_FLUSH_MS = 50;
+const OLDER_STEP = 20;
+
+// [新增] 消息列表组件：只依赖 messages / isTyping，与输入框状态隔离。
+// 父组件每次按键都会重渲染，memo 后列表仅在消息真正变化时才重绘 Markdown。
+const MessageList = React.memo(({ messages, isTyping, activeSessionId }) => {
+  const { t } = useTranslation();
+  const [visibleCount, setVisibleCount] = useState(RECENT_WINDOW);
+  const hiddenCount = Math.max(0, messages.length - visibleCount);
+  const visibleMessages = hiddenCount ? messages.slice(hiddenCount) : messages;
+
+  return (
+    <>
+      {messages.length === 0 && (
+        <div className="h-full flex flex-col items-center justify-center text-text-secondary/40 space-y-6 opacity-60">
+          <div className="w-24 h-24 bg-surface rounded-3xl shadow-soft flex items-center justify-center border border-border">
+            <Command size={40} className="text-primary/40" />
+          </div>
+          <div className="text-center">
+            <p className="text-lg font-bold text-text-primary/60 italic tracking-tight">{t('chat.system_ready')}</p>
+            <p className="text-sm">Session: {activeSessionId}</p>
+          </div>
+        </div>
+      )}
+      
+      {hiddenCount > 0 && (
+        <div className="flex justify-center">
+          <button
+            onClick={() => setVisibleCount(c => c + OLDER_STEP)}
+            className="px-3 py-1.5 text-xs text-text-secondary bg-surface border border-border rounded-full hover:text-primary hover:border-primary transition-colors"
+          >
+            {t('chat.show_older', { count: hiddenCount })}
+          </button>
+        </div>
+      )}
+
+      {visibleMessages.map((m, i) => (
+        // [修改点] 使用稳定 key (消息 id + 位置)，配合 MessageItem memo 只重绘发生变化的那一条；
+        // 后端 id 为毫秒时间戳，连续追加的消息可能重复，拼上位置保证唯一 (消息只追加，位置不变)
+        <MessageItem key={`${m.id ?? 'idx'}_${hiddenCount + i}`} m={m} />
+      ))}
+      
+      {isTyping && (
+        <div className="flex gap-4 animate-pulse">
+          <div className="w-9 h-9 rounded-xl bg-surface border border-border flex items-center justify-center">
+            <Loader2 size={18} className="text-primary animate-spin" />
+          </div>
+          <div className="bg-surface border border-border px-5 py-3.5 rounded-2xl rounded-tl-none text-text-secondary text-sm shadow-soft">
+            {t('chat.typing')}
+          </div>
+        </div>
+      )}
+    </>
+  );
+});
+
 export default function ChatInterface({ ws, isConnected }) {
   const { t } = useTranslation();
   // 会话状态
@@ -64,6 +172,11 @@ export default function ChatInterface({ ws, isConnected }) {
   const containerRef = useRef(null);
   // [新增] 标记用户是否在查看历史
   const isUserScrollingRef = useRef(false);
+  // [新增] 流式 token 合并缓冲区与定时器
+  const deltaBufferRef = useRef("");
+  const flushTimerRef = useRef(null);
+  // [新增] 当前会话已知的用户消息 ID 集合，回显去重 O(1)，不必每次扫描整个消息列表
+  const knownIdsRef = useRef(new Set());
 
   // --- [新增] URL Deep Link 支持 ---
   useEffect(() => {
@@ -80,7 +193,8 @@ export default function ChatInterface({ ws, isConnected }) {
 
   // --- 1. 会话管理逻辑 ---
 
-  const fetchSessions = async () => {
+  // [修改点] useCallback 保持引用稳定，可作为 effect 依赖
+  const fetchSessions = useCallback(async () => {
     setLoadingSessions(true);
     try {
       const res = await axios.get(`${API_BASE}/sessions`);
@@ -95,7 +209,7 @@ export default function ChatInterface({ ws, isConnected }) {
     } finally {
       setLoadingSessions(false);
     }
-  };
+  }, [t]);
 
   const createSession = async () => {
     const newId = `session_${Date.now()}`;
@@ -103,7 +217,8 @@ export default function ChatInterface({ ws, isConnected }) {
       await axios.post(`${API_BASE}/sessions`, { session_id: newId });
       setActiveSessionId(newId);
       setMessages([]);
-      fetchSessions();
+      // [修改点] 直接在本地插入新会话，无需再请求整个会话列表
+      setSessions(prev => [{ id: newId, preview: "", updated_at: Date.now() / 1000, message_count: 0 }, ...prev]);
     } catch (err) {
       toast.error(t('common.failed'));
     }
@@ -150,6 +265,7 @@ export default function ChatInterface({ ws, isConnected }) {
   const loadHistory = async (sid) => {
     try {
       const res = await axios.get(`${API_BASE}/history?session_id=${sid}`);
+      knownIdsRef.current = new Set(res.data.map(m => m.id).filter(Boolean));
       setMessages(res.data);
       // [新增] 从历史记录中恢复 Plan
       const lastPlanMsg = [...res.data].reverse().find(m => m.role === 'assistant' && m.content.includes('<plan>'));
@@ -174,7 +290,7 @@ export default function ChatInterface({ ws, isConnected }) {
 
   useEffect(() => {
     fetchSessions();
-  }, []);
+  }, [fetchSessions]);
 
   useEffect(() => {
     loadHistory(activeSessionId);
@@ -182,6 +298,31 @@ export default function ChatInterface({ ws, isConnected }) {
 
   // --- 3. WebSocket 消息处理 ---
 
+  // [新增] 将缓冲的 delta 一次性追加到最后一条 assistant 消息
+  const flushDeltas = () => {
+    clearTimeout(flushTimerRef.current);
+    flushTimerRef.current = null;
+    const deltaContent = deltaBufferRef.current;
+    if (!deltaContent) return;
+    deltaBufferRef.current = "";
+
+    setMessages(prev => {
+      const last = prev[prev.length - 1];
+      if (last?.role === 'assistant' && !last.complete) {
+        const updatedMessages = [...prev];
+        const newContent = (last.content || "") + deltaContent;
+        updatedMessages[updatedMessages.length - 1] = {
+          ...last,
+          content: newContent
+        };
+        // [新增] 实时解析 Plan
+        extractPlan(newContent);
+        return updatedMessages;
+      }
+      return [...prev, { role: 'assistant', content: deltaContent, complete: false }];
+    });
+  };
+
   useEffect(() => {
     if (!ws) return;
 
@@ -196,44 +337,38 @@ export default function ChatInterface({ ws, isConnected }) {
       }
         
         if (data.type === 'delta') {
-          const deltaContent = data.content ?? ""; 
-          setMessages(prev => {
-            const last = prev[prev.length - 1];
-            if (last?.role === 'assistant' && !last.complete) {
-              const updatedMessages = [...prev];
-              const newContent = (last.content || "") + deltaContent;
-              updatedMessages[updatedMessages.length - 1] = {
-                ...last,
-                content: newContent
-              };
-              // [新增] 实时解析 Plan
-              extractPlan(newContent);
-              return updatedMessages;
-            }
-            return [...prev, { role: 'assistant', content: deltaContent, complete: false }];
-          });
-        } 
-        else if (data.type === 'user') {
-          setMessages(prev => {
-            // 检查 ID 是否已经存在于当前列表中
-            const exists = prev.some(m => m.id === data.id);
-            if (exists) return prev; // 如果已存在（本地已添加），则忽略回显
-            
+          // [修改点] token 先进缓冲区，DELTA_FLUSH_MS 内合并为一次状态更新 (及一次 Markdown 解析)
+          deltaBufferRef.current += data.content ?? "";
+          if (!flushTimerRef.current) {
+            flushTimerRef.current = setTimeout(flushDeltas, DELTA_FLUSH_MS);
+          }
+          return;
+        }
+
+        // 其他事件到达前先冲刷缓冲区，保证消息顺序
+        flushDeltas();
+
+        if (data.type === 'user') {
+          // [修改点] 通过 ID 集合判断是否已存在（本地已添加），存在则忽略回显
+          if (!data.id || !knownIdsRef.current.has(data.id)) {
             // 如果不存在（比如是从另一个设备同步过来的消息），则添加
-            return [...prev, { 
+            const id = data.id || Date.now().toString();
+            knownIdsRef.current.add(id);
+            setMessages(prev => [...prev, { 
               role: 'user', 
               content: data.content, 
-              id: data.id || Date.now().toString() 
-            }];
-          });
+              id
+            }]);
+          }
           setIsTyping(true);
           scrollToBottom(); // 如果是用户发的信息，强制滚动到底
         }
         else if (data.type === 'done') {
-          setMessages(prev => prev.map(m => ({ ...m, complete: true })));
+          // [修改点] 仅替换仍在流式中的消息，其余消息保持原引用以命中 memo
+          setMessages(prev => prev.some(m => m.complete === false)
+            ? prev.map(m => (m.complete === false ? { ...m, complete: true } : m))
+            : prev);
           setIsTyping(false);
-          // 刷新列表以更新预览
-          fetchSessions();
         } 
         else if (data.type === 'tool') {
           setMessages(prev => [...prev, { 
@@ -262,9 +397,56 @@ export default function ChatInterface({ ws, isConnected }) {
     };
 
     ws.addEventListener('message', handleMsg);
-    return () => ws.removeEventListener('message', handleMsg);
+    return () => {
+      ws.removeEventListener('message', handleMsg);
+      // 切换会话 / 断开时丢弃尚未冲刷的 token
+      clearTimeout(flushTimerRef.current);
+      flushTimerRef.current = null;
+      deltaBufferRef.current = "";
+    };
   }, [ws, activeSessionId]); // 依赖 activeSessionId 确保消息路由正确
 
+  // [新增] 会话 id -> 下标 的索引，仅在会话列表变化时重建，查找由 O(N) 扫描变为 O(1)
+  const sessionIndex = useMemo(
+    () => new Map(sessions.map((s, i) => [s.id, i])),
+    [sessions]
+  );
+
+  // [新增] 一轮对话结束后直接在本地更新侧边栏预览，不再重新请求并解析全部会话
+  // [修改点] 通过 ref 记录上一次的 isTyping，只在 true -> false (一轮结束) 时更新；
+  // 消息数以服务端会话元数据为基准，加上本轮新增的消息数，不依赖前端渲染窗口
+  const prevTypingRef = useRef(isTyping);
+  const idleCountRef = useRef(messages.length);
+  useEffect(() => {
+    const wasTyping = prevTypingRef.current;
+    prevTypingRef.current = isTyping;
+    if (isTyping) return;
+    const added = Math.max(0, messages.length - idleCountRef.current);
+    idleCountRef.current = messages.length;
+    if (!wasTyping || !messages.length) return;
+
+    const idx = sessionIndex.get(activeSessionId);
+    if (idx === undefined) {
+      // 本地列表里没有该会话 (例如哨兵新建的会话)，回退到完整刷新
+      fetchSessions();
+      return;
+    }
+    const last = messages[messages.length - 1];
+    const preview = String(last.content ?? "").slice(0, 50);
+    setSessions(prev => {
+      // [修改点] 只替换目标条目；下标失效 (列表已被刷新) 时保持原样
+      if (prev[idx]?.id !== activeSessionId) return prev;
+      const next = prev.slice();
+      next[idx] = {
+        ...prev[idx],
+        preview,
+        updated_at: Date.now() / 1000,
+        message_count: (prev[idx].message_count ?? 0) + added
+      };
+      return next;
+    });
+  }, [isTyping, messages, sessionIndex, activeSessionId, fetchSessions]);
+
   // [修改点] 智能滚动逻辑
   const scrollToBottom = () => {
     if (scrollRef.current) {
@@ -297,6 +479,7 @@ export default function ChatInterface({ ws, isConnected }) {
     try {
     if (msg !== "/stop") {
         // 在发送消息时设置打断标记，并重置渲染状态
+        knownIdsRef.current.add(tempId);
         setMessages(prev => [...prev, { role: 'user', content: msg, id: tempId, isInterrupted: true }]);
         // 立即设置isTyping为true，重置渲染状态
         setIsTyping(true);
@@ -335,6 +518,7 @@ export default function ChatInterface({ ws, isConnected }) {
     if (!confirm(t('chat.clear_all_messages'))) return;
     try {
       await axios.delete(`${API_BASE}/sessions/${activeSessionId}/messages`);
+      knownIdsRef.current = new Set();
       setMessages([]);
       setCurrentPlan("");
     } catch(e) {
@@ -349,24 +533,6 @@ export default function ChatInterface({ ws, isConnected }) {
     }
   };
 
-  // [修复点] 确保渲染内容始终为有效节点
-  const renderMessageContent = (m) => {
-    if (m.role === 'tool') {
-        return <ToolMessage name={m.name} content={m.content} />;
-    }
-    
-    // 强制转换为字符串，防止“Objects are not valid as a React child”
-    const text = typeof m.content === 'string' ? m.content : JSON.stringify(m.content);
-    
-    return (
-        <div className="prose prose-sm max-w-none prose-slate">
-            <ReactMarkdown>
-                {text.replace(/<plan>[\s\S]*?<\/plan>/g, '*[Plan updated in Monitor]*') || ""}
-            </ReactMarkdown>
-        </div>
-    );
-  };
-
   return (
     <div className="flex h-full overflow-hidden bg-background">
       
@@ -483,51 +649,9 @@ export default function ChatInterface({ ws, isConnected }) {
             onScroll={handleScroll}
             className="flex-1 overflow-y-auto p-6 md:p-8 space-y-6"
         >
-          {messages.length === 0 && (
-            <div className="h-full flex flex-col items-center justify-center text-text-secondary/40 space-y-6 opacity-60">
-              <div className="w-24 h-24 bg-surface rounded-3xl shadow-soft flex items-center justify-center border border-border">
-                <Command size={40} className="text-primary/40" />
-              </div>
-              <div className="text-center">
-                <p className="text-lg font-bold text-text-primary/60 italic tracking-tight">{t('chat.system_ready')}</p>
-                <p className="text-sm">Session: {activeSessionId}</p>
-              </div>
-            </div>
-          )}
-          
-          {messages.map((m, i) => (
-            <div key={i} className={`flex gap-4 ${m.role === 'user' ? 'flex-row-reverse' : ''} animate-in fade-in slide-in-from-bottom-3 duration-500`}>
-              {/* 头像 */}
-              <div className={`w-9 h-9 rounded-xl flex items-center justify-center shrink-0 border shadow-sm
-                ${m.role === 'user' ? 'bg-primary border-primary text-white' : 'bg-surface border-border text-primary'}`}>
-                {m.role === 'user' ? <User size={18} /> : <Bot size={18} />}
-              </div>
-              
-              {/* 消息气泡 */}
-              <div className={`max-w-[85%] md:max-w-[75%] px-5 py-3.5 rounded-2xl text-[14.5px] leading-relaxed shadow-soft
-                ${m.role === 'user' 
-                  ? 'bg-primary text-white rounded-tr-none' 
-                  : m.role === 'tool'
-                    ? 'bg-slate-900 border border-slate-800 text-slate-300 font-mono text-xs w-full'
-                    : m.role === 'system'
-                      ? 'bg-amber-50 border border-amber-200 text-amber-800 w-full italic'
-                      : 'bg-surface border border-border text-text-primary rounded-tl-none'
-                }`}>
-                {renderMessageContent(m)}
-              </div>
-            </div>
-          ))}
-          
-          {isTyping && (
-            <div className="flex gap-4 animate-pulse">
-              <div className="w-9 h-9 rounded-xl bg-surface border border-border flex items-center justify-center">
-                <Loader2 size={18} className="text-primary animate-spin" />
-              </div>
-              <div className="bg-surface border border-border px-5 py-3.5 rounded-2xl rounded-tl-none text-text-secondary text-sm shadow-soft">
-                {t('chat.typing')}
-              </div>
-            </div>
-          )}
+          {/* [修改点] 消息列表抽离为独立的 memo 组件，输入框打字不再触发整段历史重渲染 */}
+          {/* key 绑定会话 ID：切换会话时重置可见窗口 */}
+          <MessageList key={activeSessionId} messages={messages} isTyping={isTyping} activeSessionId={activeSessionId} />
           <div ref={scrollRef} className="h-4" />
         </div>
 
@@ -17,6 +17,8 @@ import { toast } from 'sonner';
 import { useTranslation } from 'react-i18next';
 
 const API_BASE = "http://localhost:8000/api";
+// [新增] 记忆表格分页渲染：每次只挂载 PAGE_SIZE 行，记忆量大时避免一次性生成上千行 DOM
+const PAGE_SIZE = 100;
 
 export default function MemoryManager() {
   const { t } = useTranslation();
@@ -24,6 +26,7 @@ export default function MemoryManager() {
   const [loading, setLoading] = useState(true);
   const [search, setSearch] = useState("");
   const [sortMode, setSortMode] = useState("time"); // 'time', 'relevance', 'accessed'
+  const [visibleRows, setVisibleRows] = useState(PAGE_SIZE);
   
   // RAG 策略状态
   const [currentStrategy, setCurrentStrategy] = useState("semantic");
@@ -108,22 +111,33 @@ export default function MemoryManager() {
     return data;
   }, [memories, search, sortMode]);
 
+  // 搜索或排序变化时回到第一页
+  useEffect(() => {
+    setVisibleRows(PAGE_SIZE);
+  }, [search, sortMode]);
+
+  const pagedData = useMemo(
+    () => processedData.slice(0, visibleRows),
+    [processedData, visibleRows]
+  );
+
   // --- 统计数据 ---
   const stats = useMemo(() => {
     if (!memories.length) return null;
     const total = memories.length;
     
-    // 最近7天活跃
-    const now = new Date();
-    const activeRecent = memories.filter(m => {
-        const d = new Date(m.last_accessed);
-        const diffTime = Math.abs(now - d);
-        const diffDays = Math.ceil(diffTime / (1000 * 60 * 60 * 24)); 
-        return diffDays <= 7;
-    }).length;
-
-    // 计算最大访问次数（用于可视化比例）
-    const maxHits = Math.max(...memories.map(m => m.access_count || 0), 1);
+    // [修改点] 单次遍历同时统计「最近7天活跃」与最大访问次数，
+    // 避免 filter + map + Math.max(...spread) 的三次扫描 (spread 在大数组上还可能爆栈)
+    const now = Date.now();
+    const DAY_MS = 1000 * 60 * 60 * 24;
+    let activeRecent = 0;
+    let maxHits = 1;
+    for (const m of memories) {
+      const diffDays = Math.ceil(Math.abs(now - new Date(m.last_accessed)) / DAY_MS);
+      if (diffDays <= 7) activeRecent += 1;
+      const hits = m.access_count || 0;
+      if (hits > maxHits) maxHits = hits;
+    }
 
     return { total, activeRecent, maxHits };
   }, [memories]);
@@ -240,7 +254,7 @@ export default function MemoryManager() {
             ) : processedData.length === 0 ? (
               <tr><td colSpan="5" className="px-6 py-12 text-center text-slate-400">{t('memory.no_data')}</td></tr>
             ) : (
-                processedData.map((item) => {
+                pagedData.map((item) => {
                     const hitPercent = Math.min((item.access_count / (stats?.maxHits || 1)) * 100, 100);
                     
                     return (
@@ -307,6 +321,16 @@ export default function MemoryManager() {
             )}
           </tbody>
         </table>
+        {!loading && processedData.length > visibleRows && (
+          <div className="flex justify-center py-4 border-t border-slate-100">
+            <button
+              onClick={() => setVisibleRows(n => n + PAGE_SIZE)}
+              className="px-4 py-1.5 text-xs font-medium text-slate-500 bg-slate-50 border border-slate-200 rounded-lg hover:text-primary hover:border-primary transition"
+            >
+              {t('memory.load_more', { count: processedData.length - visibleRows })}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
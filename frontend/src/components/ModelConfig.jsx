@@ -1,12 +1,212 @@
 // frontend/src/components/ModelConfig.jsx
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useMemo, useCallback } from 'react';
 import { useTranslation } from 'react-i18next'; // [修改点] 引入 i18n
 import axios from 'axios';
-import { Settings, CheckCircle, Cpu, Key, Server, Plus, Edit2, Trash2, X, Save } from 'lucide-react';
+import { Settings, CheckCircle, Cpu, Key, Server, Plus, Edit2, Trash2, X, Save, Upload } from 'lucide-react';
 import { toast } from 'sonner';
 
 const API_BASE = "http://localhost:8000/api";
 
+// [新增] 单个 Profile 卡片，memo 化后弹窗表单输入时不会重绘整组卡片
+// [修改点] isPending: 有尚未应用的暂存修改；isSaved: 后端已存在该 Profile (新建且未应用的不能激活 / 删除)
+const ProfileCard = React.memo(({ id, profile, isActive, isPending, isSaved, onActivate, onEdit, onDelete }) => (
+  <div 
+    className={`relative bg-white rounded-xl border transition-all duration-300 p-6 flex flex-col md:flex-row items-start justify-between group
+      ${isActive 
+        ? 'border-primary shadow-glow ring-1 ring-primary/20' 
+        : 'border-slate-200 hover:border-slate-300 hover:shadow-md'
+      }`}
+  >
+    <div className="space-y-4 flex-1 w-full">
+      <div className="flex items-center gap-3">
+        <div className={`p-2 rounded-lg ${isActive ? 'bg-primary text-white' : 'bg-slate-100 text-slate-500'}`}>
+          <Cpu size={24} />
+        </div>
+        <div>
+          <h3 className="text-lg font-bold text-slate-800 flex items-center gap-2">
+              {profile.name || id}
+              {/* ID Badge */}
+              {id !== (profile.name) && <span className="px-1.5 py-0.5 rounded bg-slate-100 text-slate-400 text-[10px] font-mono font-normal">{id}</span>}
+          </h3>
+          <div className="text-xs font-mono text-slate-400 uppercase tracking-wider">{profile.provider} • {profile.model} • Temp: {profile.temperature}</div>
+        </div>
+        {isActive && (
+          <span className="ml-auto md:ml-4 px-3 py-1 bg-green-100 text-green-700 text-xs font-bold rounded-full flex items-center gap-1 shrink-0">
+            <CheckCircle size={12} /> Active
+          </span>
+        )}
+        {isPending && (
+          <span className="ml-auto md:ml-4 px-3 py-1 bg-amber-100 text-amber-700 text-xs font-bold rounded-full shrink-0">
+            Unsaved
+          </span>
+        )}
+      </div>
+
+      <div className="grid grid-cols-1 md:grid-cols-2 gap-4 mt-4 bg-slate-50/50 p-4 rounded-lg border border-slate-100">
+        <div className="flex items-center gap-2 text-sm text-slate-600 overflow-hidden">
+          <Server size={14} className="text-slate-400 shrink-0" />
+          <span className="font-mono truncate" title={profile.base_url}>{profile.base_url || "Default URL"}</span>
+        </div>
+        <div className="flex items-center gap-2 text-sm text-slate-600">
+          <Key size={14} className="text-slate-400 shrink-0" />
+          <span className="font-mono">
+            {profile.api_key && profile.api_key.length > 10 
+              ? `${profile.api_key.substring(0, 6)}...${profile.api_key.substring(profile.api_key.length - 4)}` 
+              : "******"}
+          </span>
+        </div>
+      </div>
+    </div>
+
+    <div className="mt-6 md:mt-0 md:ml-6 flex flex-row md:flex-col items-end gap-3 w-full md:w-auto justify-end">
+      {!isActive && isSaved && (
+        <button 
+          onClick={() => onActivate(id)}
+          className="px-5 py-2 bg-white border border-slate-300 text-slate-700 font-medium rounded-lg hover:bg-primary hover:text-white hover:border-primary transition shadow-sm w-full md:w-auto"
+        >
+          Activate
+        </button>
+      )}
+      
+      <div className="flex gap-2">
+          <button 
+              onClick={() => onEdit(id, profile)}
+              className="p-2 text-slate-400 hover:text-blue-500 hover:bg-blue-50 rounded-lg transition"
+              title="Edit"
+          >
+              <Edit2 size={18} />
+          </button>
+          {!isActive && isSaved && (
+              <button 
+                  onClick={() => onDelete(id)}
+                  className="p-2 text-slate-400 hover:text-red-500 hover:bg-red-50 rounded-lg transition"
+                  title="Delete"
+              >
+                  <Trash2 size={18} />
+              </button>
+          )}
+      </div>
+    </div>
+  </div>
+));
+
+// [新增] Profile 编辑弹窗：表单状态收敛在弹窗内部，
+// 输入时只重渲染弹窗本身，不会带动父组件和整组 Profile 卡片
+const ProfileModal = ({ initialData, isEditing, onClose, onSave }) => {
+  const { t } = useTranslation();
+  const [formData, setFormData] = useState(initialData);
+
+  return (
+    <div className="fixed inset-0 z-50 flex items-center justify-center p-4 bg-black/40 backdrop-blur-sm animate-in fade-in duration-200">
+        <div className="bg-white rounded-2xl shadow-2xl w-full max-w-lg overflow-hidden border border-slate-200 animate-in zoom-in-95 duration-200">
+            <div className="px-6 py-4 border-b border-slate-100 flex justify-between items-center bg-slate-50/50">
+                <h3 className="font-bold text-slate-800 text-lg">
+                    {isEditing ? t('settings.modal_edit') : t('settings.modal_new')}
+                </h3>
+                <button onClick={onClose} className="text-slate-400 hover:text-slate-600 p-1">
+                    <X size={20} />
+                </button>
+            </div>
+            
+            <div className="p-6 space-y-4 max-h-[70vh] overflow-y-auto">
+                <div className="grid grid-cols-2 gap-4">
+                    <div className="space-y-1">
+                        <label className="text-xs font-bold text-slate-500 uppercase">Profile ID (Unique)</label>
+                        <input 
+                            className="w-full p-2.5 bg-slate-50 border border-slate-200 rounded-lg text-sm font-mono focus:outline-none focus:ring-2 focus:ring-primary/20 focus:border-primary transition disabled:opacity-50"
+                            value={formData.profile_id}
+                            onChange={e => setFormData({...formData, profile_id: e.target.value})}
+                            disabled={isEditing} // ID cannot be changed once created
+                            placeholder="my_custom_model"
+                        />
+                    </div>
+                    <div className="space-y-1">
+                        <label className="text-xs font-bold text-slate-500 uppercase">Display Name</label>
+                        <input 
+                            className="w-full p-2.5 bg-slate-50 border border-slate-200 rounded-lg text-sm focus:outline-none focus:ring-2 focus:ring-primary/20 focus:border-primary transition"
+                            value={formData.name}
+                            onChange={e => setFormData({...formData, name: e.target.value})}
+                            placeholder="My GPT-4"
+                        />
+                    </div>
+                </div>
+
+                <div className="space-y-1">
+                    <label className="text-xs font-bold text-slate-500 uppercase">Provider</label>
+                    <select 
+                        className="w-full p-2.5 bg-slate-50 border border-slate-200 rounded-lg text-sm focus:outline-none focus:ring-2 focus:ring-primary/20 focus:border-primary transition"
+                        value={formData.provider}
+                        onChange={e => setFormData({...formData, provider: e.target.value})}
+                    >
+                        <option value="openai">OpenAI Compatible (GPT/DeepSeek/Qwen)</option>
+                        <option value="ollama">Ollama (Local)</option>
+                        <option value="azure">Azure OpenAI</option>
+                        <option value="anthropic">Anthropic</option>
+                    </select>
+                </div>
+
+                <div className="space-y-1">
+                    <label className="text-xs font-bold text-slate-500 uppercase">Base URL</label>
+                    <input 
+                        className="w-full p-2.5 bg-slate-50 border border-slate-200 rounded-lg text-sm font-mono focus:outline-none focus:ring-2 focus:ring-primary/20 focus:border-primary transition"
+                        value={formData.base_url}
+                        onChange={e => setFormData({...formData, base_url: e.target.value})}
+                        placeholder="https://api.openai.com/v1"
+                    />
+                </div>
+
+                <div className="grid grid-cols-3 gap-4">
+                    <div className="col-span-2 space-y-1">
+                        <label className="text-xs font-bold text-slate-500 uppercase">Model Name</label>
+                        <input 
+                            className="w-full p-2.5 bg-slate-50 border border-slate-200 rounded-lg text-sm font-mono focus:outline-none focus:ring-2 focus:ring-primary/20 focus:border-primary transition"
+                            value={formData.model}
+                            onChange={e => setFormData({...formData, model: e.target.value})}
+                            placeholder="gpt-4o"
+                        />
+                    </div>
+                    <div className="space-y-1">
+                        <label className="text-xs font-bold text-slate-500 uppercase">Temperature</label>
+                        <input 
+                            type="number" step="0.1" min="0" max="2"
+                            className="w-full p-2.5 bg-slate-50 border border-slate-200 rounded-lg text-sm font-mono focus:outline-none focus:ring-2 focus:ring-primary/20 focus:border-primary transition"
+                            value={formData.temperature}
+                            onChange={e => setFormData({...formData, temperature: parseFloat(e.target.value)})}
+                        />
+                    </div>
+                </div>
+
+                <div className="space-y-1">
+                    <label className="text-xs font-bold text-slate-500 uppercase">API Key</label>
+                    <input 
+                        type="password"
+                        className="w-full p-2.5 bg-slate-50 border border-slate-200 rounded-lg text-sm font-mono focus:outline-none focus:ring-2 focus:ring-primary/20 focus:border-primary transition"
+                        value={formData.api_key}
+                        onChange={e => setFormData({...formData, api_key: e.target.value})}
+                        placeholder="sk-..."
+                    />
+                </div>
+            </div>
+
+            <div className="p-4 border-t border-slate-100 flex justify-end gap-3 bg-slate-50/50">
+                <button 
+                    onClick={onClose}
+                    className="px-4 py-2 text-slate-500 hover:bg-slate-100 rounded-lg transition text-sm font-medium"
+                >
+                    Cancel
+                </button>
+                <button 
+                    onClick={() => onSave(formData)}
+                    className="px-6 py-2 bg-primary text-white rounded-lg hover:bg-primary-hover shadow-lg shadow-primary/20 transition flex items-center gap-2 text-sm font-bold"
+                >
+                    <Save size={16} /> Save Profile
+                </button>
+            </div>
+        </div>
+  </div>
+  );
+};
+
 export default function ModelConfig() {
   const { t } = useTranslation(); // [修改点] 获取翻译函数
   const [config, setConfig] = useState(null);
@@ -15,15 +215,11 @@ export default function ModelConfig() {
   // Modal State
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [editingProfileId, setEditingProfileId] = useState(null);
-  const [formData, setFormData] = useState({
-    profile_id: '',
-    name: '',
-    provider: 'openai',
-    model: '',
-    api_key: '',
-    base_url: '',
-    temperature: 0.7
-  });
+  const [modalData, setModalData] = useState(null);
+  // [新增] 暂存的 Profile 修改 (profile_id -> 表单数据)：弹窗保存只写入这里，
+  // "全部应用" 时通过 /config/profiles/batch 一次提交，后端只写一次 YAML、只重载一次配置
+  const [pendingProfiles, setPendingProfiles] = useState({});
+  const [applying, setApplying] = useState(false);
 
   const fetchConfig = async () => {
     try {
@@ -39,17 +235,19 @@ export default function ModelConfig() {
 
   // --- Actions ---
 
-  const handleActivate = async (profileId) => {
+  // [修改点] 卡片回调使用 useCallback 保持引用稳定，配合 ProfileCard 的 memo
+  const handleActivate = useCallback(async (profileId) => {
     try {
       await axios.post(`${API_BASE}/config/active`, { profile_id: profileId });
       toast.success(t('common.success'));
-      fetchConfig();
+      // [修改点] 激活只改变 active_profile，本地更新即可，不必重新拉取整个配置
+      setConfig(prev => ({ ...prev, active_profile: profileId }));
     } catch (err) { toast.error(t('common.failed')); }
-  };
+  }, [t]);
 
-  const openEditModal = (id, profile) => {
+  const openEditModal = useCallback((id, profile) => {
     setEditingProfileId(id);
-    setFormData({
+    setModalData({
       profile_id: id,
       name: profile.name || id,
       provider: profile.provider || 'openai',
@@ -59,11 +257,11 @@ export default function ModelConfig() {
       temperature: profile.temperature || 0.7
     });
     setIsModalOpen(true);
-  };
+  }, []);
 
   const openAddModal = () => {
     setEditingProfileId(null);
-    setFormData({
+    setModalData({
       profile_id: '',
       name: '',
       provider: 'openai',
@@ -75,31 +273,63 @@ export default function ModelConfig() {
     setIsModalOpen(true);
   };
 
-  const handleDelete = async (id) => {
+  const handleDelete = useCallback(async (id) => {
     if (!confirm(t('settings.delete_confirm', { id }))) return; // [修改点] 翻译带参数
     try {
       await axios.delete(`${API_BASE}/config/profiles/${id}`);
       toast.success(t('common.success'));
+      // 已删除的 Profile 不应在之后 "全部应用" 时被重新写回
+      setPendingProfiles(prev => {
+        if (!(id in prev)) return prev;
+        const next = { ...prev };
+        delete next[id];
+        return next;
+      });
       fetchConfig();
     } catch (err) { toast.error(t('common.failed')); }
-  };
+  }, [t]);
+
+  const closeModal = useCallback(() => setIsModalOpen(false), []);
 
-  const handleSave = async () => {
+  const handleSave = async (formData) => {
     if (!formData.profile_id || !formData.model || !formData.api_key) {
       toast.error("ID, Model and API Key are required.");
       return;
     }
 
+    // [修改点] 只暂存到本地，由 "全部应用" 统一提交
+    setPendingProfiles(prev => ({ ...prev, [formData.profile_id]: formData }));
+    setIsModalOpen(false);
+  };
+
+  // [新增] 一次性提交全部暂存修改
+  const applyPending = async () => {
+    const items = Object.values(pendingProfiles);
+    if (!items.length) return;
+    setApplying(true);
     try {
-      await axios.post(`${API_BASE}/config/profiles/save`, formData);
-      toast.success(t('profile_saved_successfully'));
-      setIsModalOpen(false);
+      await axios.post(`${API_BASE}/config/profiles/batch`, items);
+      toast.success(t('settings.profile_saved_successfully'));
+      setPendingProfiles({});
       fetchConfig();
     } catch (err) {
-      toast.error(t("failed_save_profile"), err);
+      toast.error(t('settings.failed_save_profile'), { description: String(err.message || err) });
+    } finally {
+      setApplying(false);
     }
   };
 
+  const discardPending = () => setPendingProfiles({});
+
+  const pendingCount = Object.keys(pendingProfiles).length;
+
+  // [新增] Profile 列表只在 config / 暂存修改变化时重新生成，弹窗内每次按键重渲染时复用同一数组
+  // 暂存的修改覆盖已保存的同名 Profile，新建的排在最后
+  const profileEntries = useMemo(
+    () => (config ? Object.entries({ ...(config.profiles || {}), ...pendingProfiles }) : []),
+    [config, pendingProfiles]
+  );
+
   if (loading) return <div className="p-8 flex items-center justify-center h-full text-slate-400">{t('settings.loading')}</div>;
 
   return (
@@ -112,205 +342,58 @@ export default function ModelConfig() {
         </h1>
             <p className="text-slate-500 mt-2">{t('settings.subtitle')}</p>
         </div>
-        <button 
-          onClick={openAddModal}
-          className="flex items-center gap-2 px-4 py-2 bg-primary text-white rounded-xl hover:bg-primary-hover shadow-lg shadow-primary/20 transition-all font-medium text-sm"
-        >
-          <Plus size={18} />  {t('settings.add_profile')} 
-        </button>
+        <div className="flex items-center gap-3">
+          {pendingCount > 0 && (
+            <>
+              <button
+                onClick={discardPending}
+                disabled={applying}
+                className="px-4 py-2 text-slate-500 hover:bg-slate-100 rounded-xl transition font-medium text-sm disabled:opacity-50"
+              >
+                {t('settings.discard_pending')}
+              </button>
+              <button
+                onClick={applyPending}
+                disabled={applying}
+                className="flex items-center gap-2 px-4 py-2 bg-amber-500 text-white rounded-xl hover:bg-amber-600 shadow-lg shadow-amber-500/20 transition-all font-medium text-sm disabled:opacity-50"
+              >
+                <Upload size={18} /> {t('settings.apply_all', { count: pendingCount })}
+              </button>
+            </>
+          )}
+          <button 
+            onClick={openAddModal}
+            className="flex items-center gap-2 px-4 py-2 bg-primary text-white rounded-xl hover:bg-primary-hover shadow-lg shadow-primary/20 transition-all font-medium text-sm"
+          >
+            <Plus size={18} />  {t('settings.add_profile')} 
+          </button>
+        </div>
       </header>
 
       <div className="grid gap-6 pb-20">
-        {Object.entries(config.profiles).map(([id, profile]) => {
-          const isActive = config.active_profile === id;
-          return (
-            <div 
-              key={id} 
-              className={`relative bg-white rounded-xl border transition-all duration-300 p-6 flex flex-col md:flex-row items-start justify-between group
-                ${isActive 
-                  ? 'border-primary shadow-glow ring-1 ring-primary/20' 
-                  : 'border-slate-200 hover:border-slate-300 hover:shadow-md'
-                }`}
-            >
-              <div className="space-y-4 flex-1 w-full">
-                <div className="flex items-center gap-3">
-                  <div className={`p-2 rounded-lg ${isActive ? 'bg-primary text-white' : 'bg-slate-100 text-slate-500'}`}>
-                    <Cpu size={24} />
-                  </div>
-                  <div>
-                    <h3 className="text-lg font-bold text-slate-800 flex items-center gap-2">
-                        {profile.name || id}
-                        {/* ID Badge */}
-                        {id !== (profile.name) && <span className="px-1.5 py-0.5 rounded bg-slate-100 text-slate-400 text-[10px] font-mono font-normal">{id}</span>}
-                    </h3>
-                    <div className="text-xs font-mono text-slate-400 uppercase tracking-wider">{profile.provider} • {profile.model} • Temp: {profile.temperature}</div>
-                  </div>
-                  {isActive && (
-                    <span className="ml-auto md:ml-4 px-3 py-1 bg-green-100 text-green-700 text-xs font-bold rounded-full flex items-center gap-1 shrink-0">
-                      <CheckCircle size={12} /> Active
-                    </span>
-                  )}
-                </div>
-
-                <div className="grid grid-cols-1 md:grid-cols-2 gap-4 mt-4 bg-slate-50/50 p-4 rounded-lg border border-slate-100">
-                  <div className="flex items-center gap-2 text-sm text-slate-600 overflow-hidden">
-                    <Server size={14} className="text-slate-400 shrink-0" />
-                    <span className="font-mono truncate" title={profile.base_url}>{profile.base_url || "Default URL"}</span>
-                  </div>
-                  <div className="flex items-center gap-2 text-sm text-slate-600">
-                    <Key size={14} className="text-slate-400 shrink-0" />
-                    <span className="font-mono">
-                      {profile.api_key && profile.api_key.length > 10 
-                        ? `${profile.api_key.substring(0, 6)}...${profile.api_key.substring(profile.api_key.length - 4)}` 
-                        : "******"}
-                    </span>
-                  </div>
-                </div>
-              </div>
-
-              <div className="mt-6 md:mt-0 md:ml-6 flex flex-row md:flex-col items-end gap-3 w-full md:w-auto justify-end">
-                {!isActive && (
-                  <button 
-                    onClick={() => handleActivate(id)}
-                    className="px-5 py-2 bg-white border border-slate-300 text-slate-700 font-medium rounded-lg hover:bg-primary hover:text-white hover:border-primary transition shadow-sm w-full md:w-auto"
-                  >
-                    Activate
-                  </button>
-                )}
-                
-                <div className="flex gap-2">
-                    <button 
-                        onClick={() => openEditModal(id, profile)}
-                        className="p-2 text-slate-400 hover:text-blue-500 hover:bg-blue-50 rounded-lg transition"
-                        title="Edit"
-                    >
-                        <Edit2 size={18} />
-                    </button>
-                    {!isActive && (
-                        <button 
-                            onClick={() => handleDelete(id)}
-                            className="p-2 text-slate-400 hover:text-red-500 hover:bg-red-50 rounded-lg transition"
-                            title="Delete"
-                        >
-                            <Trash2 size={18} />
-                </button>
-                    )}
-                </div>
-              </div>
-            </div>
-          );
-        })}
+        {profileEntries.map(([id, profile]) => (
+          <ProfileCard
+            key={id}
+            id={id}
+            profile={profile}
+            isActive={config.active_profile === id}
+            isPending={id in pendingProfiles}
+            isSaved={id in (config.profiles || {})}
+            onActivate={handleActivate}
+            onEdit={openEditModal}
+            onDelete={handleDelete}
+          />
+        ))}
       </div>
       
       {/* --- Edit/Add Modal --- */}
       {isModalOpen && (
-        <div className="fixed inset-0 z-50 flex items-center justify-center p-4 bg-black/40 backdrop-blur-sm animate-in fade-in duration-200">
-            <div className="bg-white rounded-2xl shadow-2xl w-full max-w-lg overflow-hidden border border-slate-200 animate-in zoom-in-95 duration-200">
-                <div className="px-6 py-4 border-b border-slate-100 flex justify-between items-center bg-slate-50/50">
-                    <h3 className="font-bold text-slate-800 text-lg">
-                        {editingProfileId ? t('settings.modal_edit') : t('settings.modal_new')}
-                    </h3>
-                    <button onClick={() => setIsModalOpen(false)} className="text-slate-400 hover:text-slate-600 p-1">
-                        <X size={20} />
-                    </button>
-                </div>
-                
-                <div className="p-6 space-y-4 max-h-[70vh] overflow-y-auto">
-                    <div className="grid grid-cols-2 gap-4">
-                        <div className="space-y-1">
-                            <label className="text-xs font-bold text-slate-500 uppercase">Profile ID (Unique)</label>
-                            <input 
-                                className="w-full p-2.5 bg-slate-50 border border-slate-200 rounded-lg text-sm font-mono focus:outline-none focus:ring-2 focus:ring-primary/20 focus:border-primary transition disabled:opacity-50"
-                                value={formData.profile_id}
-                                onChange={e => setFormData({...formData, profile_id: e.target.value})}
-                                disabled={!!editingProfileId} // ID cannot be changed once created
-                                placeholder="my_custom_model"
-                            />
-                        </div>
-                        <div className="space-y-1">
-                            <label className="text-xs font-bold text-slate-500 uppercase">Display Name</label>
-                            <input 
-                                className="w-full p-2.5 bg-slate-50 border border-slate-200 rounded-lg text-sm focus:outline-none focus:ring-2 focus:ring-primary/20 focus:border-primary transition"
-                                value={formData.name}
-                                onChange={e => setFormData({...formData, name: e.target.value})}
-                                placeholder="My GPT-4"
-                            />
-                        </div>
-                    </div>
-
-                    <div className="space-y-1">
-                        <label className="text-xs font-bold text-slate-500 uppercase">Provider</label>
-                        <select 
-                            className="w-full p-2.5 bg-slate-50 border border-slate-200 rounded-lg text-sm focus:outline-none focus:ring-2 focus:ring-primary/20 focus:border-primary transition"
-                            value={formData.provider}
-                            onChange={e => setFormData({...formData, provider: e.target.value})}
-                        >
-                            <option value="openai">OpenAI Compatible (GPT/DeepSeek/Qwen)</option>
-                            <option value="ollama">Ollama (Local)</option>
-                            <option value="azure">Azure OpenAI</option>
-                            <option value="anthropic">Anthropic</option>
-                        </select>
-                    </div>
-
-                    <div className="space-y-1">
-                        <label className="text-xs font-bold text-slate-500 uppercase">Base URL</label>
-                        <input 
-                            className="w-full p-2.5 bg-slate-50 border border-slate-200 rounded-lg text-sm font-mono focus:outline-none focus:ring-2 focus:ring-primary/20 focus:border-primary transition"
-                            value={formData.base_url}
-                            onChange={e => setFormData({...formData, base_url: e.target.value})}
-                            placeholder="https://api.openai.com/v1"
-                        />
-                    </div>
-
-                    <div className="grid grid-cols-3 gap-4">
-                        <div className="col-span-2 space-y-1">
-                            <label className="text-xs font-bold text-slate-500 uppercase">Model Name</label>
-                            <input 
-                                className="w-full p-2.5 bg-slate-50 border border-slate-200 rounded-lg text-sm font-mono focus:outline-none focus:ring-2 focus:ring-primary/20 focus:border-primary transition"
-                                value={formData.model}
-                                onChange={e => setFormData({...formData, model: e.target.value})}
-                                placeholder="gpt-4o"
-                            />
-                        </div>
-                        <div className="space-y-1">
-                            <label className="text-xs font-bold text-slate-500 uppercase">Temperature</label>
-                            <input 
-                                type="number" step="0.1" min="0" max="2"
-                                className="w-full p-2.5 bg-slate-50 border border-slate-200 rounded-lg text-sm font-mono focus:outline-none focus:ring-2 focus:ring-primary/20 focus:border-primary transition"
-                                value={formData.temperature}
-                                onChange={e => setFormData({...formData, temperature: parseFloat(e.target.value)})}
-                            />
-                        </div>
-                    </div>
-
-                    <div className="space-y-1">
-                        <label className="text-xs font-bold text-slate-500 uppercase">API Key</label>
-                        <input 
-                            type="password"
-                            className="w-full p-2.5 bg-slate-50 border border-slate-200 rounded-lg text-sm font-mono focus:outline-none focus:ring-2 focus:ring-primary/20 focus:border-primary transition"
-                            value={formData.api_key}
-                            onChange={e => setFormData({...formData, api_key: e.target.value})}
-                            placeholder="sk-..."
-                        />
-                    </div>
-                </div>
-
-                <div className="p-4 border-t border-slate-100 flex justify-end gap-3 bg-slate-50/50">
-                    <button 
-                        onClick={() => setIsModalOpen(false)}
-                        className="px-4 py-2 text-slate-500 hover:bg-slate-100 rounded-lg transition text-sm font-medium"
-                    >
-                        Cancel
-                    </button>
-                    <button 
-                        onClick={handleSave}
-                        className="px-6 py-2 bg-primary text-white rounded-lg hover:bg-primary-hover shadow-lg shadow-primary/20 transition flex items-center gap-2 text-sm font-bold"
-                    >
-                        <Save size={16} /> Save Profile
-                    </button>
-                </div>
-            </div>
-      </div>
+        <ProfileModal
+          initialData={modalData}
+          isEditing={!!editingProfileId}
+          onClose={closeModal}
+          onSave={handleSave}
+        />
       )}
     </div>
   );
@@ -1,17 +1,23 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { useTranslation } from 'react-i18next';
 import { Cpu, Database, Battery, Zap, Activity, HardDrive, RefreshCw } from 'lucide-react';
 
 const API_BASE = "http://localhost:8000/api";
+// [新增] 轮询间隔；后端对指标有 2 秒 TTL 缓存，更快的轮询没有意义
+const POLL_INTERVAL_MS = 3000;
 
 export default function SystemMonitor() {
   const { t } = useTranslation(); // [修改点] 获取翻译函数
   const [metrics, setMetrics] = useState(null);
   const [processes, setProcesses] = useState([]);
   const [loading, setLoading] = useState(true);
+  // [新增] 上一轮请求未返回时不再叠加新请求 (psutil 遍历进程可能较慢)
+  const inFlightRef = useRef(false);
 
   const refreshData = async () => {
+    if (inFlightRef.current) return;
+    inFlightRef.current = true;
     try {
       const [mRes, pRes] = await Promise.all([
         axios.get(`${API_BASE}/system/metrics`),
@@ -22,13 +28,31 @@ export default function SystemMonitor() {
       setLoading(false);
     } catch (err) {
       console.error("Monitor error:", err);
+    } finally {
+      inFlightRef.current = false;
     }
   };
 
+  // [修改点] 页面不可见 (切到后台/最小化) 时暂停轮询，重新可见时立即刷新一次
   useEffect(() => {
-    refreshData();
-    const timer = setInterval(refreshData, 3000);
-    return () => clearInterval(timer);
+    let timer = null;
+    const start = () => {
+      if (timer) return;
+      refreshData();
+      timer = setInterval(refreshData, POLL_INTERVAL_MS);
+    };
+    const stop = () => {
+      clearInterval(timer);
+      timer = null;
+    };
+    const onVisibilityChange = () => (document.hidden ? stop() : start());
+
+    if (!document.hidden) start();
+    document.addEventListener('visibilitychange', onVisibilityChange);
+    return () => {
+      stop();
+      document.removeEventListener('visibilitychange', onVisibilityChange);
+    };
   }, []);
 
   if (loading && !metrics) {
@@ -0,0 +1,82 @@
+# tests/function_test/fast_yaml_test.py
+# fast_yaml 的 JSON 旁路快照：按 YAML 的 (mtime_ns, size) 校验新鲜度，类型无法经 JSON 往返时不写快照
+import os
+import sys
+import datetime
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from utils import fast_yaml
+
+SIDECAR_SUFFIX = fast_yaml.SIDECAR_SUFFIX
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_sidecar_follows_yaml_stat():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "config.yaml")
+        _write(path, "name: first\n")
+        assert fast_yaml.load_file(path) == {"name": "first"}
+        assert os.path.exists(path + SIDECAR_SUFFIX)
+
+        # 以更旧的 mtime 写回不同内容 (cp -p / 保留 mtime 的编辑器)：快照必须失效
+        st = os.stat(path)
+        _write(path, "name: second-value\n")
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - 10 ** 9))
+        assert fast_yaml.load_file(path) == {"name": "second-value"}
+
+        # 快照已按新的 stat 刷新，再次读取命中快照
+        with open(path + SIDECAR_SUFFIX, "r", encoding="utf-8") as f:
+            assert '"second-value"' in f.read()
+        assert fast_yaml.load_file(path) == {"name": "second-value"}
+
+
+def test_integer_keys_skip_sidecar():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "profiles.yaml")
+        _write(path, "profiles:\n  1:\n    model: m\n")
+        assert fast_yaml.load_file(path) == {"profiles": {1: {"model": "m"}}}
+        assert not os.path.exists(path + SIDECAR_SUFFIX)
+        # 再次读取仍解析 YAML，键保持为 int
+        assert fast_yaml.load_file(path) == {"profiles": {1: {"model": "m"}}}
+
+
+def test_unserialisable_values_skip_sidecar():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "user_profile.yaml")
+        _write(path, "birthday: 2024-01-02\n")
+        assert fast_yaml.load_file(path) == {"birthday": datetime.date(2024, 1, 2)}
+        assert not os.path.exists(path + SIDECAR_SUFFIX)
+        # 失败的快照写入不能留下临时文件
+        assert os.listdir(d) == ["user_profile.yaml"]
+
+
+def test_dump_file_refreshes_sidecar():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "config.yaml")
+        _write(path, "a: 1\n")
+        assert fast_yaml.load_file(path) == {"a": 1}
+
+        fast_yaml.dump_file({"a": 2, "b": ["x"]}, path)
+        with open(path + SIDECAR_SUFFIX, "r", encoding="utf-8") as f:
+            assert '"b"' in f.read()
+        assert fast_yaml.load_file(path) == {"a": 2, "b": ["x"]}
+
+        # 写入含非字符串键的数据时，旧快照被删除而不是残留
+        fast_yaml.dump_file({1: "one"}, path)
+        assert not os.path.exists(path + SIDECAR_SUFFIX)
+        assert fast_yaml.load_file(path) == {1: "one"}
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✅ {name}")
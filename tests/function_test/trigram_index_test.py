@@ -0,0 +1,98 @@
+# tests/function_test/trigram_index_test.py
+# trigram 索引：候选预筛选 -> 逐文件校验，以及分批建索引 / 增量刷新
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from core.functools import trigram_index
+from core.functools.trigram_index import TrigramIndex
+from core.functools.tools import Toolbox, SEARCH_IGNORE_DIRS, SEARCH_TEXT_EXTS
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _make_tree(root):
+    _write(os.path.join(root, "hit.md"), "Resonance is a Windows AI host.")
+    # 包含 "resonance" 的全部三元组，但没有连续出现该词：索引会把它作为候选，校验阶段应排除
+    _write(os.path.join(root, "false_positive.txt"), "resonate, then nance")
+    _write(os.path.join(root, "miss.py"), "print('hello world')")
+    _write(os.path.join(root, "sub", "nested.txt"), "deep RESONANCE inside")
+    _write(os.path.join(root, "node_modules", "ignored.js"), "resonance")
+    _write(os.path.join(root, "image.png"), "resonance")
+
+
+def _open_index(root, db_dir):
+    return TrigramIndex(root, os.path.join(db_dir, "index.db"), SEARCH_IGNORE_DIRS, SEARCH_TEXT_EXTS)
+
+
+def test_candidates_are_superset_of_matches():
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as db_dir:
+        _make_tree(root)
+        with _open_index(root, db_dir) as index:
+            assert index.refresh() == (4, 0, True)
+            candidates = index.candidates("resonance")
+            # 关键词不足 3 个字符时无法预筛选
+            assert index.candidates("re") is None
+
+        names = sorted(os.path.relpath(p, root) for p in candidates)
+        assert names == sorted(["false_positive.txt", "hit.md", os.path.join("sub", "nested.txt")])
+
+
+def test_search_with_index_verifies_candidates():
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as log_dir:
+        _make_tree(root)
+        toolbox = Toolbox.__new__(Toolbox)
+        toolbox.agent = type("Agent", (), {"config": {"system": {"log_dir": log_dir}}})()
+
+        found, verified = toolbox._search_with_index(root, "Resonance")
+        assert verified == 3
+        assert sorted(os.path.relpath(p, root) for p in found) == sorted(["hit.md", os.path.join("sub", "nested.txt")])
+
+
+def test_large_files_are_always_candidates():
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as db_dir:
+        _write(os.path.join(root, "big.log"), "x" * 64)
+        original = trigram_index.TRIGRAM_MAX_FILE_BYTES
+        trigram_index.TRIGRAM_MAX_FILE_BYTES = 16
+        try:
+            with _open_index(root, db_dir) as index:
+                index.refresh()
+                assert [os.path.basename(p) for p in index.candidates("resonance")] == ["big.log"]
+        finally:
+            trigram_index.TRIGRAM_MAX_FILE_BYTES = original
+
+
+def test_refresh_is_incremental_and_budgeted():
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as db_dir:
+        _make_tree(root)
+        with _open_index(root, db_dir) as index:
+            # 每次只允许读 1 字节：每次 refresh 只索引一个文件，直到全部完成
+            results = []
+            while True:
+                result = index.refresh(byte_budget=1)
+                results.append(result)
+                if result[2]:
+                    break
+            assert sum(r[0] for r in results) == 4
+            assert index.refresh() == (0, 0, True)
+
+            os.remove(os.path.join(root, "hit.md"))
+            _write(os.path.join(root, "miss.py"), "print('resonance')")
+            assert index.refresh() == (1, 1, True)
+            names = sorted(os.path.basename(p) for p in index.candidates("resonance"))
+            assert names == ["false_positive.txt", "miss.py", "nested.txt"]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✅ {name}")